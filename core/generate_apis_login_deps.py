@@ -45,7 +45,7 @@ def write_deps(models: List[ClassModel], output_dir: str, other_cfg: schemas.Oth
     if user_model_name and other_cfg.use_authentication:
         f_deps_name = f"deps.py"
         f_deps_path = os.path.join(out_dir, f_deps_name)
-        content_deps = generate_deps_module(user_model_name)
+        content_deps = generate_deps_module(user_model_name, use_async_db=other_cfg.use_async_db)
         final_deps = preserve_custom_sections(f_deps_path, content_deps)
         with open(f_deps_path, "w", encoding="utf-8") as fp:
             fp.write(final_deps)
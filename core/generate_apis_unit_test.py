@@ -25,7 +25,7 @@ from utils.generate_data_test import generate_data, generate_random_boolean, gen
 # Configuration & logging
 # ---------------------------------------------------------------------------
 OUTPUT_DIR = "/tests"
-TEST_LIST = ["create", "update", "get", "get_by_id", "delete"]
+TEST_LIST = ["create", "bulk_create", "bulk_delete", "update", "patch", "get", "export", "aggregate", "get_by_id", "etag", "delete"]
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -40,6 +40,7 @@ def _gen_imports(other_cfg: schemas.OtherConfigSchema) -> str:
         "from fastapi import status",
         "from app import crud, schemas",
         "from datetime import datetime, timedelta",
+        "import json",
         "import random"
 
     ]
@@ -215,7 +216,9 @@ def _gen_test_api(
     fk_fields = [attr.name for attr in model.attributes if attr.is_foreign]
     fk_fields_literal = repr(fk_fields)
 
-    for op in TEST_LIST:
+    # the response cache middleware replays the ETag of the cached responses
+    test_list = TEST_LIST + (["etag_cached"] if other_cfg.use_response_cache else [])
+    for op in test_list:
         tl: List[str] = [f"\n\ndef test_{op}_{table_name}_api(client, db):",
                          f'    """{op.capitalize()} {model.name} via API."""']
 
@@ -264,6 +267,32 @@ def _gen_test_api(
                       if a.name not in ("id", "hashed_password") and a.type.lower() != 'datetime'
                   ]
 
+        # --------------------------------------------------------------------
+        # BULK CREATE test
+        elif op == "bulk_create":
+            tl += [
+                f"    resp = client.post('{base_ep}/bulk?return_ids=true', json=[{table_name}_data], {hdrs_kwarg})",
+                "    assert resp.status_code == status.HTTP_200_OK, resp.text",
+                "    result = resp.json()",
+                "    assert result['count'] == 1",
+                "    assert len(result['ids']) == 1",
+                f"    resp_g = client.get(f'{base_ep}/{{result[\"ids\"][0]}}', {hdrs_kwarg})",
+                "    assert resp_g.status_code == status.HTTP_200_OK",
+            ]
+
+        # --------------------------------------------------------------------
+        # BULK DELETE test
+        elif op == "bulk_delete":
+            tl += [
+                f"    resp_c = client.post('{base_ep}/bulk?return_ids=true', json=[{table_name}_data], {hdrs_kwarg})",
+                "    ids = resp_c.json()['ids']",
+                f"    resp_d = client.request('DELETE', '{base_ep}/bulk', content=f'{{ids[0]}}\\n0\\n', {hdrs_kwarg})",
+                "    assert resp_d.status_code == status.HTTP_200_OK, resp_d.text",
+                "    assert resp_d.json()['count'] == 1",
+                f"    resp_chk = client.get(f'{base_ep}/{{ids[0]}}', {hdrs_kwarg})",
+                "    assert resp_chk.status_code == status.HTTP_404_NOT_FOUND",
+            ]
+
         # --------------------------------------------------------------------
         # UPDATE test
         elif op == "update":
@@ -311,6 +340,27 @@ def _gen_test_api(
                       if a.name not in ("id", "hashed_password") and not a.is_foreign and a.type.lower() != 'json'
                   ]
 
+        # --------------------------------------------------------------------
+        # PATCH test
+        elif op == "patch":
+            tl += [
+                      f"    resp_c = client.post('{base_ep}/', json={table_name}_data, {hdrs_kwarg})",
+                      "    assert resp_c.status_code == status.HTTP_200_OK",
+                      "    created = resp_c.json()",
+                      f"    patch_data = {{k: v for k, v in {table_name}_data.items() if k != 'password'}}",
+                      f"    resp_p = client.patch(f'{base_ep}/{{created[\"id\"]}}', json=patch_data, {hdrs_kwarg})",
+                      "    assert resp_p.status_code == status.HTTP_200_OK, resp_p.text",
+                      "    patched = resp_p.json()",
+                      "    assert patched['id'] == created['id']",
+                  ] + [
+                      f"    assert patched['{a.name}'] == created['{a.name}']"
+                      for a in model.attributes
+                      if a.name not in ("id", "hashed_password") and a.type.lower() != 'datetime'
+                  ] + [
+                      f"    resp_missing = client.patch('{base_ep}/0', json=patch_data, {hdrs_kwarg})",
+                      "    assert resp_missing.status_code == status.HTTP_404_NOT_FOUND",
+                  ]
+
         # --------------------------------------------------------------------
         # GET test
         elif op == "get":
@@ -320,6 +370,43 @@ def _gen_test_api(
                 "    assert resp_g.status_code == status.HTTP_200_OK",
                 "    items = resp_g.json()['data']",
                 "    assert any(item.get('id') for item in items)",
+                f"    resp_f = client.get('{base_ep}/?fields=id', {hdrs_kwarg})",
+                "    assert resp_f.status_code == status.HTTP_200_OK, resp_f.text",
+            ] + [
+                f"    assert all('{a.name}' not in item for item in resp_f.json()['data'])"
+                for a in model.attributes
+                if a.name not in ("id", "hashed_password")
+            ] + [
+                f"    resp_bad = client.get('{base_ep}/?fields=unknown_field', {hdrs_kwarg})",
+                "    assert resp_bad.status_code == status.HTTP_400_BAD_REQUEST",
+            ]
+
+        # --------------------------------------------------------------------
+        # EXPORT test
+        elif op == "export":
+            tl += [
+                f"    resp_c = client.post('{base_ep}/', json={table_name}_data, {hdrs_kwarg})",
+                "    created = resp_c.json()",
+                f"    resp_e = client.get('{base_ep}/export', {hdrs_kwarg})",
+                "    assert resp_e.status_code == status.HTTP_200_OK",
+                "    assert any(line and json.loads(line)['id'] == created['id'] for line in resp_e.text.splitlines())",
+                f"    resp_csv = client.get('{base_ep}/export?format=csv&fields=id', {hdrs_kwarg})",
+                "    assert resp_csv.status_code == status.HTTP_200_OK",
+                "    assert resp_csv.text.splitlines()[0] == 'id'",
+            ]
+
+        # --------------------------------------------------------------------
+        # AGGREGATE test
+        elif op == "aggregate":
+            tl += [
+                f"    client.post('{base_ep}/', json={table_name}_data, {hdrs_kwarg})",
+                f"    resp_a = client.get('{base_ep}/aggregate', params={{'metrics': '[\"count\", \"max:id\"]'}}, {hdrs_kwarg})",
+                "    assert resp_a.status_code == status.HTTP_200_OK, resp_a.text",
+                "    result = resp_a.json()",
+                "    assert result[0]['count'] >= 1",
+                "    assert result[0]['max_id'] is not None",
+                f"    resp_bad = client.get('{base_ep}/aggregate', params={{'metrics': '[\"median:id\"]'}}, {hdrs_kwarg})",
+                "    assert resp_bad.status_code == status.HTTP_400_BAD_REQUEST",
             ]
 
         # --------------------------------------------------------------------
@@ -334,6 +421,40 @@ def _gen_test_api(
                 "    assert retrieved['id'] == created['id']",
             ]
 
+        # --------------------------------------------------------------------
+        # Conditional GET test (ETag / If-None-Match)
+        elif op == "etag":
+            auth_header = '"Authorization": f"Bearer {token}", ' if other_cfg.use_authentication else ""
+            tl += [
+                f"    resp_c = client.post('{base_ep}/', json={table_name}_data, {hdrs_kwarg})",
+                "    created = resp_c.json()",
+                f"    resp_g = client.get(f'{base_ep}/{{created[\"id\"]}}', {hdrs_kwarg})",
+                f"    resp_l = client.get('{base_ep}/', {hdrs_kwarg})",
+                f"    resp_g_304 = client.get(f'{base_ep}/{{created[\"id\"]}}', headers={{{auth_header}'If-None-Match': resp_g.headers['etag']}})",
+                f"    resp_l_304 = client.get('{base_ep}/', headers={{{auth_header}'If-None-Match': resp_l.headers['etag']}})",
+                "    assert resp_g_304.status_code == status.HTTP_304_NOT_MODIFIED",
+                "    assert resp_l_304.status_code == status.HTTP_304_NOT_MODIFIED",
+                f"    client.delete(f'{base_ep}/{{created[\"id\"]}}', {hdrs_kwarg})",
+                f"    resp_l_200 = client.get('{base_ep}/', headers={{{auth_header}'If-None-Match': resp_l.headers['etag']}})",
+                "    assert resp_l_200.status_code == status.HTTP_200_OK",
+            ]
+
+        # --------------------------------------------------------------------
+        # Conditional GET served by the response cache
+        elif op == "etag_cached":
+            auth_header = '"Authorization": f"Bearer {token}", ' if other_cfg.use_authentication else ""
+            tl += [
+                f"    resp_c = client.post('{base_ep}/', json={table_name}_data, {hdrs_kwarg})",
+                "    created = resp_c.json()",
+                f"    resp_miss = client.get(f'{base_ep}/{{created[\"id\"]}}', {hdrs_kwarg})",
+                f"    resp_hit = client.get(f'{base_ep}/{{created[\"id\"]}}', {hdrs_kwarg})",
+                "    assert resp_hit.headers['x-cache'] == 'HIT'",
+                "    assert resp_hit.headers['etag'] == resp_miss.headers['etag']",
+                f"    resp_304 = client.get(f'{base_ep}/{{created[\"id\"]}}', headers={{{auth_header}'If-None-Match': resp_hit.headers['etag']}})",
+                "    assert resp_304.status_code == status.HTTP_304_NOT_MODIFIED",
+                "    assert resp_304.headers['etag'] == resp_miss.headers['etag']",
+            ]
+
         # --------------------------------------------------------------------
         # DELETE test
         elif op == "delete":
@@ -10,7 +10,8 @@ def generate_base_file(models: List[ClassModel]):
     lines = [
         f"# Import all the models, so that Base has them before being",
         f"# imported by Alembic",
-        f"from app.db.base_class import Base # noqa"
+        f"from app.db.base_class import Base # noqa",
+        f"from app.db.trigram import Trigram # noqa",
     ]
     for model in models:
         model = ClassModel(**model)
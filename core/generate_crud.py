@@ -27,8 +27,15 @@ def generate_crud_imports(table_name: str, model_name: str, user_models="") -> s
     ]
 
     import_user = [
-        "from app.core.security import get_password_hash, verify_password",
+        "from app.core import cache",
+        "from app.core.security import (",
+        "    get_password_hash,",
+        "    run_in_password_pool,",
+        "    verify_password,",
+        "    verify_password_async,",
+        ")",
         "from fastapi.encoders import jsonable_encoder",
+        "from starlette.concurrency import run_in_threadpool",
     ]
     if model_name.upper() == user_models.upper():
         imports += import_user
@@ -63,7 +70,9 @@ def generate_crud_functions(table_name: str, model_name: str, other_config: sche
         f"    def delete(self, db: Session, *, id: int) -> {model_name}:",
         f"        obj = db.query({model_name}).filter({model_name}.id == id).first()",
         f"        db.delete(obj)",
+        f"        self.sync_trigrams(db, ids=[id])",
         f"        db.commit()",
+        f"        self.after_write(db, ids=[id])",
         f"        return obj",
         "",
     ]
@@ -87,14 +96,44 @@ def generate_crud_functions(table_name: str, model_name: str, other_config: sche
             f"            return None",
             f"        return user",
             "",
-            f"    def create(self, db: Session, *, obj_in: {model_name}Create) -> {model_name}:",
+            f"    async def authenticate_async(self, db: Session, *, email: str, password: str) -> {model_name}:",
+            f"        # bcrypt runs in the password pool, the lookup in the regular threadpool",
+            f"        user = await run_in_threadpool(self.get_by_email, db, email=email)",
+            f"        if not user:",
+            f"            return None",
+            f"        if not await verify_password_async(password, user.hashed_password):",
+            f"            return None",
+            f"        return user",
+            "",
+            f"    def create(",
+            f"            self, db: Session, *, obj_in: {model_name}Create, hashed_password: Optional[str] = None",
+            f"    ) -> {model_name}:",
+            f"        # routes hash with get_password_hash_async and pass `hashed_password`",
             f"        obj_data = jsonable_encoder(obj_in)",
             f"        pass_value = obj_data.pop('password')",
-            f"        db_obj = {model_name}(hashed_password=get_password_hash(pass_value), **obj_data)",
+            f"        if hashed_password is None:",
+            f"            hashed_password = run_in_password_pool(get_password_hash, pass_value)",
+            f"        db_obj = {model_name}(hashed_password=hashed_password, **obj_data)",
             f"        db.add(db_obj)",
+            f"        self.sync_trigrams(db, objs=[db_obj])",
             f"        db.commit()",
             f"        db.refresh(db_obj)",
+            f"        self.after_write(db, ids=[])",
             f"        return db_obj",
+            "",
+            f"    def get_insert_row(self, obj_in: Any) -> Dict[str, Any]:",
+            f"        row = super().get_insert_row(obj_in)",
+            f"        row['hashed_password'] = run_in_password_pool(get_password_hash, row.pop('password'))",
+            f"        return row",
+            "",
+            f"    def after_write(self, db: Session, *, ids: Optional[List[Any]] = None) -> None:",
+            f"        super().after_write(db, ids=ids)",
+            f"        # drop the users cached by deps.get_current_user",
+            f"        if ids is None:",
+            f"            cache.user_cache.clear()",
+            f"            return",
+            f"        for id in ids:",
+            f"            cache.user_cache.delete(id)",
             f"",
             f"",
         ]
@@ -1,26 +1,45 @@
 from model_type import camel_to_snake
 
 
-def generate_deps_module(user_model_name: str = "User") -> str:
+def generate_deps_module(user_model_name: str = "User", use_async_db: bool = False) -> str:
     """
     Generate the FastAPI deps module for authentication and user retrieval.
 
     Args:
         user_model_name: Name of the SQLAlchemy model for users (default: "User")
+        use_async_db: Add the `*_async` dependencies used by the async routers
     """
     user_table_name = camel_to_snake(user_model_name)
-    return f'''from typing import Generator
+    module = generate_sync_deps(user_model_name, user_table_name)
+    if use_async_db:
+        module = module.replace(
+            "from app.db.session import SessionLocal, read_session\n",
+            "from app.db.async_session import get_async_db\n"
+            "from app.db.session import SessionLocal, read_session\n",
+        ).replace(
+            "from sqlalchemy import inspect\n",
+            "from sqlalchemy import inspect\nfrom sqlalchemy.ext.asyncio import AsyncSession\n",
+        )
+        module += generate_async_deps(user_model_name, user_table_name)
+    return module
+
+
+def generate_sync_deps(user_model_name: str, user_table_name: str) -> str:
+    return f'''import hashlib
+import time
+from typing import Any, Generator, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from app import crud, models, schemas
-from app.core import security
+from app.core import cache, security
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, read_session
 
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -36,10 +55,30 @@ def get_db() -> Generator:
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(reusable_oauth2)
-) -> models.{user_model_name}:
+def get_read_db(request: Request) -> Generator:
+    """
+    `get_db` for the read only routes: the session is bound to a read replica
+    when the project uses them, see `session.read_session`.
+    """
+    try:
+        db = read_session(request)
+        yield db
+    finally:
+        db.close()
+
+
+def decode_token(token: str) -> schemas.TokenPayload:
+    """
+    Verify a JWT and validate its payload.
+
+    Payloads are kept in `cache.token_cache`, keyed by the token hash, until
+    the token expires: the dependencies of a request (and the next requests)
+    sharing a token only verify it once. See `cache.token_cache.stats()`.
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    token_data = cache.token_cache.get(key)
+    if token_data is not None:
+        return token_data
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -50,39 +89,47 @@ def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    if expires_in is None or expires_in > 0:
+        cache.token_cache.set(key, token_data, ttl=expires_in)
+    return token_data
 
-    user = crud.{user_table_name}.get(db, id=token_data.id)
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(reusable_oauth2)
+) -> models.{user_model_name}:
+    token_data = decode_token(token)
+    user = get_cached_user(db, user_id=token_data.id)
     if not user:
         raise HTTPException(status_code=403, detail="User not found")
     return user
 
 
+def get_cached_user(db: Session, user_id: Any) -> Optional[models.{user_model_name}]:
+    """
+    Load a user by id, keeping its column values in `cache.user_cache` so that
+    authenticated requests don't query the user table every time.
+    """
+    data = cache.user_cache.get(user_id)
+    if data is not None:
+        user = models.{user_model_name}(**data)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    user = crud.{user_table_name}.get(db, id=user_id)
+    if user:
+        mapper = inspect(user).mapper
+        cache.user_cache.set(user_id, {{attr.key: getattr(user, attr.key) for attr in mapper.column_attrs}})
+    return user
+
+
 def get_user(token: str) -> models.{user_model_name}:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = schemas.TokenPayload(**payload)
-    except (jwt.JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    return token_data
+    return decode_token(token)
 
 
 def get_token_info(token: str = Depends(reusable_oauth2)):
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = schemas.TokenPayload(**payload)
-    except (jwt.JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    return token_data
+    return decode_token(token)
 
 
 def get_current_active_user(
@@ -102,3 +149,40 @@ def get_current_active_superuser(
         )
     return current_user
 '''
+
+
+def generate_async_deps(user_model_name: str, user_table_name: str) -> str:
+    """
+    Auth dependencies of the async routers: the user is loaded on the
+    `AsyncSession` of the route, no threadpool thread is used.
+    """
+    return f'''
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(reusable_oauth2)
+) -> models.{user_model_name}:
+    token_data = decode_token(token)
+    user = await db.run_sync(lambda session: get_cached_user(session, user_id=token_data.id))
+    if not user:
+        raise HTTPException(status_code=403, detail="User not found")
+    return user
+
+
+async def get_current_active_user_async(
+    current_user: models.{user_model_name} = Depends(get_current_user_async),
+) -> models.{user_model_name}:
+    if not crud.{user_table_name}.is_active(current_user):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+
+async def get_current_active_superuser_async(
+    current_user: models.{user_model_name} = Depends(get_current_user_async),
+) -> models.{user_model_name}:
+    if not crud.{user_table_name}.is_superuser(current_user):
+        raise HTTPException(
+            status_code=400, detail="The user doesn't have enough privileges"
+        )
+    return current_user
+'''
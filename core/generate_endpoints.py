@@ -21,73 +21,230 @@ def generate_router_file(table_name, other_config, user_model_name):
     table_user_name = camel_to_snake(user_model_name)
     # Common imports
     imports = [
-        "from typing import Any",
-        "from fastapi import APIRouter, Depends, HTTPException",
-        "from fastapi.encoders import jsonable_encoder",
+        "from typing import Any, Dict, List, Optional",
+        "from fastapi import APIRouter, Depends, HTTPException, Query, Request",
+        "from fastapi.concurrency import run_in_threadpool",
         "from sqlalchemy.orm import Session",
         "from app.api import deps",
         "from app import crud, models, schemas",
-        "import ast",
+        "from app.crud.base import BULK_DELETE_CHUNK_SIZE, MAX_AGGREGATE_GROUPS, CountMode",
+        "from app.api.etag import etag_matches, make_etag, not_modified, with_etag",
+        "from app.api.export import ExportFormat, export_response",
+        "from app.api.fields import fields_response, parse_fields",
+        "from app.api.query_parser import parse_relation, parse_string_list, parse_where",
+        "from app.api.responses import json_response",
         "",
         f"router = APIRouter()",
     ]
 
+    # Async routes run the CRUD methods on an AsyncSession through AsyncCRUD
+    use_async_db = other_config.use_async_db
+    def_ = "async def" if use_async_db else "def"
+    await_ = "await " if use_async_db else ""
+    crud_ref = f"{crud_name}_crud" if use_async_db else f"crud.{crud_name}"
+    db_dependency = (
+        "db: AsyncSession = Depends(get_async_db),"
+        if use_async_db
+        else "db: Session = Depends(deps.get_db),"
+    )
+    # read only routes get a session bound to a read replica when the project uses them
+    read_db_dependency = (
+        "db: AsyncSession = Depends(get_async_read_db),"
+        if use_async_db
+        else "db: Session = Depends(deps.get_read_db),"
+    )
+    if use_async_db:
+        imports[-1:-1] = [
+            "from sqlalchemy.ext.asyncio import AsyncSession",
+            "from app.crud.base_async import AsyncCRUD",
+            "from app.db.async_session import get_async_db, get_async_read_db",
+            "",
+        ]
+
     # Conditional imports and dependencies
-    auth_dependency = f"current_user: models.{user_model_name} = Depends(deps.get_current_active_user)," if other_config.use_authentication else ""
+    # async routers load the current user on their AsyncSession (deps.*_async)
+    current_user_dependency = "get_current_active_user_async" if use_async_db else "get_current_active_user"
+    auth_dependency = f"current_user: models.{user_model_name} = Depends(deps.{current_user_dependency})," if other_config.use_authentication else ""
     auth_import = "from app.api import deps" if other_config.use_authentication else ""
 
+    # the sync CRUD runs in the threadpool since the bulk delete route awaits the request body
+    bulk_remove_call = (
+        f"await {crud_ref}.bulk_remove("
+        if use_async_db
+        else f"await run_in_threadpool(crud.{crud_name}.bulk_remove, "
+    )
+
+    column_keys = f"crud.{crud_name}.get_column_keys()"
+
+    # the password of a new user is hashed in the password pool without holding a thread
+    hash_password = other_config.use_authentication and table_name == table_user_name
+    if hash_password:
+        imports[-1:-1] = ["from app.core.security import get_password_hash_async", ""]
+    create_def = "async def" if hash_password else def_
+    create_call = f"{await_}{crud_ref}.create(db=db, obj_in={router_name}_in)"
+    if hash_password:
+        create_call = (
+            f"await {crud_ref}.create(db=db, obj_in={router_name}_in, hashed_password=hashed_password)"
+            if use_async_db
+            else f"await run_in_threadpool(crud.{crud_name}.create, db=db, obj_in={router_name}_in, hashed_password=hashed_password)"
+        )
+
     data = f"{router_name}_id"
     value = f"{{{data}}}"
 
     # Route definitions
     routes = [
         f"@router.get('/', response_model=schemas.{response_model_name})",
-        f"def read_{generate_filename(router_name)}(",
+        f"{def_} read_{generate_filename(router_name)}(",
         "        *,",
         "        offset: int = 0,",
         "        limit: int = 20,",
         "        relation: str = \"[]\",",
         "        where: str = \"[]\",",
-        "        db: Session = Depends(deps.get_db),",
+        "        cursor: Optional[str] = None,",
+        "        count_mode: CountMode = \"exact\",",
+        "        fields: Optional[str] = None,",
+        "        request: Request,",
+        f"        {read_db_dependency}",
         f"        {auth_dependency}",
         ") -> Any:",
         f"    \"\"\"",
         f"    Retrieve {generate_filename(router_name)}.",
+        f"",
+        f"    Pass the `next_cursor` of a response as `cursor` to get the next page",
+        f"    without scanning the skipped rows (`offset` is then ignored).",
+        f"    `count_mode` is one of `exact`, `cached` (short lived cache) or",
+        f"    `estimated` (table statistics, only used without `where`).",
+        f"    `fields` (e.g. `id,name`) restricts the loaded and returned columns.",
+        f"    Without `relation`, the ETag of the page is checked against `If-None-Match`",
+        f"    before running the query (304 when unchanged).",
+        f"    \"\"\"",
+        "    relations = parse_relation(relation)",
+        "    wheres = parse_where(where)",
+        f"    field_names = parse_fields(fields, {column_keys})",
+        "",
+        "    # the ETag follows the version of this table only, no ETag with included relations",
+        "    etag = None",
+        "    if not relations:",
+        f"        etag = make_etag(request, crud.{crud_name}.get_version())",
+        "        if etag_matches(request, etag):",
+        "            return not_modified(etag)",
+        "",
+        "    if cursor:",
+        f"        {generate_filename(router_name)}, next_cursor = {await_}{crud_ref}.get_page_by_cursor(",
+        f"          db=db, relations=relations, cursor=cursor, limit=limit, where=wheres, base_columns=field_names)",
+        f"        count = {await_}{crud_ref}.get_count_where_array(db=db, where=wheres, count_mode=count_mode)",
+        "    else:",
+        f"        {generate_filename(router_name)}, count = {await_}{crud_ref}.get_page_with_count(",
+        f"          db=db, relations=relations, skip=offset, limit=limit, where=wheres, count_mode=count_mode,",
+        f"          base_columns=field_names)",
+        f"        next_cursor = crud.{crud_name}.get_next_cursor({generate_filename(router_name)}, limit=limit)",
+        f"    content = {{'count': count, 'data': {generate_filename(router_name)}, 'next_cursor': next_cursor}}",
+        "    if field_names:",
+        f"        return with_etag(fields_response(",
+        f"          schemas.{response_model_name}, content, fields=field_names, column_keys={column_keys}), etag)",
+        f"    return with_etag(json_response(schemas.{response_model_name}Adapter, content), etag)",
+        "",
+        "",
+        f"@router.get('/export')",
+        f"def export_{generate_filename(router_name)}(",
+        "        *,",
+        "        where: str = \"[]\",",
+        "        fields: Optional[str] = None,",
+        "        format: ExportFormat = \"ndjson\",",
+        "        request: Request,",
+        f"        {auth_dependency}",
+        ") -> Any:",
+        f"    \"\"\"",
+        f"    Stream every {router_name} matching `where` as NDJSON (one object per line) or CSV.",
+        f"",
+        f"    The rows are read from a server-side cursor, the export never holds the whole",
+        f"    table in memory. `fields` (e.g. `id,name`) restricts the exported columns.",
         f"    \"\"\"",
-        ""
-        "    relations = []",
-        "    if relation is not None and relation != \"\" and relation != []:",
-        "       relations += ast.literal_eval(relation)",
+        "    wheres = parse_where(where)",
+        f"    field_names = parse_fields(fields, {column_keys})",
+        f"    return export_response(crud.{crud_name}, schemas.{schema_name}, where=wheres, columns=field_names, format=format,",
+        "                           request=request)",
         "",
-        "    wheres = []",
-        "    if where is not None and where != \"\" and where != []:",
-        "       wheres += ast.literal_eval(where)",
         "",
-        f"    {generate_filename(router_name)} = crud.{crud_name}.get_multi_where_array(",
-        f"      db=db, relations=relations, skip=offset, limit=limit, where=wheres)",
-        f"    count = crud.{crud_name}.get_count_where_array(db=db, where=wheres)",
-        f"    response = schemas.{response_model_name}(**{{'count': count, 'data': jsonable_encoder({generate_filename(router_name)})}})",
-        "    return response",
+        f"@router.get('/aggregate', response_model=List[Dict[str, Any]])",
+        f"{def_} aggregate_{generate_filename(router_name)}(",
+        "        *,",
+        "        group_by: str = \"[]\",",
+        "        metrics: str = '[\"count\"]',",
+        "        where: str = \"[]\",",
+        "        limit: int = Query(MAX_AGGREGATE_GROUPS, ge=1, le=MAX_AGGREGATE_GROUPS),",
+        f"        {read_db_dependency}",
+        f"        {auth_dependency}",
+        ") -> Any:",
+        f"    \"\"\"",
+        f"    Aggregate the {generate_filename(router_name)} matching `where` in the database.",
+        f"",
+        f"    `group_by` is a list of columns or dotted relation paths (e.g. `[\"category.name\"]`),",
+        f"    `metrics` a list of `count` or `<count|sum|avg|min|max>:<column>` (e.g. `[\"count\", \"sum:price\"]`).",
+        f"    Returns one object per group, e.g. `{{\"category.name\": \"food\", \"count\": 2, \"sum_price\": 7}}`.",
+        f"    \"\"\"",
+        "    groups = parse_string_list(group_by, \"group_by\")",
+        "    metric_list = parse_string_list(metrics, \"metrics\")",
+        "    wheres = parse_where(where)",
+        f"    return {await_}{crud_ref}.aggregate(db=db, group_by=groups, metrics=metric_list, where=wheres, limit=limit)",
         "",
         "",
         f"@router.post('/', response_model=schemas.{schema_name})",
-        f"def create_{router_name}(",
+        f"{create_def} create_{router_name}(",
         "        *,",
-        "        db: Session = Depends(deps.get_db),",
+        f"        {db_dependency}",
         f"        {router_name}_in: schemas.{schema_name}Create,",
         f"        {auth_dependency}",
         ") -> Any:",
         f"    \"\"\"",
         f"    Create new {router_name}.",
         f"    \"\"\"",
-        f"    {router_name} = crud.{crud_name}.create(db=db, obj_in={router_name}_in)",
+        *([f"    hashed_password = await get_password_hash_async({router_name}_in.password)"] if hash_password else []),
+        f"    {router_name} = {create_call}",
         f"    return {router_name}",
         "",
         "",
+        f"@router.post('/bulk', response_model=schemas.BulkResult)",
+        f"{def_} create_{router_name}_bulk(",
+        "        *,",
+        f"        {db_dependency}",
+        f"        {router_name}_in: List[schemas.{schema_name}Create],",
+        "        return_ids: bool = False,",
+        f"        {auth_dependency}",
+        ") -> Any:",
+        f"    \"\"\"",
+        f"    Create many {generate_filename(router_name)} with batched INSERT statements.",
+        f"",
+        f"    The response holds the number of created rows, and their ids with `return_ids`.",
+        f"    \"\"\"",
+        f"    count, ids = {await_}{crud_ref}.bulk_create(db=db, objs_in={router_name}_in, return_ids=return_ids)",
+        "    return schemas.BulkResult(count=count, ids=ids)",
+        "",
+        "",
+        f"@router.delete('/bulk', response_model=schemas.BulkResult)",
+        f"async def delete_{router_name}_bulk(",
+        "        *,",
+        "        request: Request,",
+        "        chunk_size: int = Query(BULK_DELETE_CHUNK_SIZE, ge=1),",
+        f"        {db_dependency}",
+        f"        {auth_dependency}",
+        ") -> Any:",
+        f"    \"\"\"",
+        f"    Delete many {generate_filename(router_name)} by id, `chunk_size` rows per DELETE and transaction.",
+        f"",
+        f"    The body is a JSON array of ids or one id per line. The response holds the",
+        f"    number of deleted rows and the number deleted by each chunk.",
+        f"    \"\"\"",
+        "    ids = await request.body()",
+        f"    chunks = {bulk_remove_call}db=db, ids_to_delete=ids, chunk_size=chunk_size)",
+        "    return schemas.BulkResult(count=sum(chunks), chunks=chunks)",
+        "",
+        "",
         f"@router.put('/{value}', response_model=schemas.{schema_name})",
-        f"def update_{router_name}(",
+        f"{def_} update_{router_name}(",
         "        *,",
-        "        db: Session = Depends(deps.get_db),",
+        f"        {db_dependency}",
         f"        {router_name}_id: int,",
         f"        {router_name}_in: schemas.{schema_name}Update,",
         f"        {auth_dependency}",
@@ -95,60 +252,88 @@ def generate_router_file(table_name, other_config, user_model_name):
         f"    \"\"\"",
         f"    Update an {router_name}.",
         f"    \"\"\"",
-        f"    {router_name} = crud.{crud_name}.get(db=db, id={router_name}_id)",
+        f"    {router_name} = {await_}{crud_ref}.get(db=db, id={router_name}_id)",
+        f"    if not {router_name}:",
+        f"        raise HTTPException(status_code=404, detail='{schema_name} not found')",
+        f"    {router_name} = {await_}{crud_ref}.update(db=db, db_obj={router_name}, obj_in={router_name}_in)",
+        f"    return {router_name}",
+        "",
+        "",
+        f"@router.patch('/{value}', response_model=schemas.{schema_name})",
+        f"{def_} patch_{router_name}(",
+        "        *,",
+        f"        {db_dependency}",
+        f"        {router_name}_id: int,",
+        f"        {router_name}_in: schemas.{schema_name}Update,",
+        f"        {auth_dependency}",
+        ") -> Any:",
+        f"    \"\"\"",
+        f"    Update the given fields of an {router_name} with a single UPDATE statement.",
+        f"    \"\"\"",
+        f"    {router_name} = {await_}{crud_ref}.update_by_id(db=db, id={router_name}_id, obj_in={router_name}_in)",
         f"    if not {router_name}:",
         f"        raise HTTPException(status_code=404, detail='{schema_name} not found')",
-        f"    {router_name} = crud.{crud_name}.update(db=db, db_obj={router_name}, obj_in={router_name}_in)",
         f"    return {router_name}",
         "",
         "",
         f"@router.get('/{value}', response_model=schemas.{schema_name})",
-        f"def read_{router_name}(",
+        f"{def_} read_{router_name}(",
         "        *,",
         "        relation: str = \"[]\",",
         "        where: str = \"[]\",",
-        "        db: Session = Depends(deps.get_db),",
+        "        fields: Optional[str] = None,",
+        "        request: Request,",
+        f"        {read_db_dependency}",
         f"        {router_name}_id: int,",
         f"        {auth_dependency}",
         ") -> Any:",
         f"    \"\"\"",
         f"    Get {router_name} by ID.",
+        f"",
+        f"    `fields` (e.g. `id,name`) restricts the loaded and returned columns.",
+        f"    Without `relation`, answers `If-None-Match` with a 304 when the table did not change.",
         f"    \"\"\"",
-        ""
-        "    relations = []",
-        "    if relation is not None and relation != \"\" and relation != [] and relation != \"[]\":",
-        "       relations += ast.literal_eval(relation)",
+        "    relations = parse_relation(relation)",
+        "    wheres = parse_where(where)",
+        f"    field_names = parse_fields(fields, {column_keys})",
         "",
-        "    wheres = []",
-        "    if where is not None and where != \"\" and where != []:",
-        "       wheres += ast.literal_eval(where)",
+        "    etag = None",
+        "    if not relations:",
+        f"        etag = make_etag(request, crud.{crud_name}.get_version())",
+        "        if etag_matches(request, etag):",
+        "            return not_modified(etag)",
         "",
-        f"    {router_name} = crud.{crud_name}.get(db=db, id={router_name}_id, relations=relations, where=wheres)",
+        f"    {router_name} = {await_}{crud_ref}.get(",
+        f"      db=db, id={router_name}_id, relations=relations, where=wheres, base_columns=field_names)",
         f"    if not {router_name}:",
         f"        raise HTTPException(status_code=404, detail='{schema_name} not found')",
-        f"    return {router_name}",
+        "    if field_names:",
+        f"        return with_etag(fields_response(",
+        f"          schemas.{schema_name}, {router_name}, fields=field_names, column_keys={column_keys}), etag)",
+        f"    return with_etag(json_response(schemas.{schema_name}Adapter, {router_name}), etag)",
         "",
         "",
         f"@router.delete('/{value}', response_model=schemas.Msg)",
-        f"def delete_{router_name}(",
+        f"{def_} delete_{router_name}(",
         "        *,",
-        "        db: Session = Depends(deps.get_db),",
+        f"        {db_dependency}",
         f"        {router_name}_id: int,",
         f"        {auth_dependency}",
         ") -> Any:",
         f"    \"\"\"",
         f"    Delete an {router_name}.",
         f"    \"\"\"",
-        f"    {router_name} = crud.{crud_name}.get(db=db, id={router_name}_id)",
+        f"    {router_name} = {await_}{crud_ref}.get(db=db, id={router_name}_id)",
         f"    if not {router_name}:",
         f"        raise HTTPException(status_code=404, detail='{schema_name} not found')",
-        f"    {router_name} = crud.{crud_name}.remove(db=db, id={router_name}_id)",
+        f"    {router_name} = {await_}{crud_ref}.remove(db=db, id={router_name}_id)",
         f"    return schemas.Msg(msg='{schema_name} deleted successfully')",
         "",
     ]
 
     # Combine imports and routes
-    router_lines = imports + ([auth_import] if auth_import else []) + routes
+    async_crud_lines = [f"{crud_name}_crud = AsyncCRUD(crud.{crud_name})", "", ""] if use_async_db else []
+    router_lines = imports + ([auth_import] if auth_import else []) + async_crud_lines + routes
 
     # Filter out empty strings and join with newlines
     return "\n".join(line for line in router_lines if line.strip() != "" or line == "")
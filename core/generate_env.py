@@ -28,6 +28,9 @@ MYSQL_PORT={replace_cote(config["mysql_port"])}
 MYSQL_USER='{replace_cote(config["mysql_user"])}'
 MYSQL_PASSWORD='{replace_cote(config["mysql_password"])}'
 MYSQL_DATABASE='{replace_cote(config["mysql_database"])}'
+# Comma-separated SQLAlchemy URLs of the read replicas (projects generated with use_read_replicas)
+REPLICA_DATABASE_URIS=''
+REPLICA_ROUTING='round_robin'  # or least_connections
 
 # --- Superuser Credentials ---
 FIRST_SUPERUSER='{replace_cote(config["first_superuser"])}'
@@ -7,11 +7,11 @@ def generate_init_file(folder, folder_type: str = "schemas"):
     """Generate an __init__.py file to import schema classes from each file."""
     lines = []
     for file_name in os.listdir(folder):
-        if file_name.endswith(".py") and file_name != "__init__.py" and file_name != "base.py" and file_name != "base_copy.py":
+        if file_name.endswith(".py") and file_name != "__init__.py" and file_name != "base.py" and file_name != "base_copy.py" and file_name != "base_async.py":
             module_name = file_name.replace(".py", "")
             class_name = generate_class_name(module_name)
             if folder_type == "schemas":
-                if module_name == 'msg':
+                if module_name in ('msg', 'bulk_result'):
                     lines.append(
                         f"from .{module_name} import {class_name}")
                 elif module_name == "token":
@@ -19,7 +19,7 @@ def generate_init_file(folder, folder_type: str = "schemas"):
                         f"from .{module_name} import  {class_name}, {class_name}Payload")
                 else:
                     lines.append(
-                        f"from .{module_name} import ( \n  {class_name},  \n  {class_name}Create,  \n  {class_name}Update,  \n  Response{class_name}\n)")
+                        f"from .{module_name} import ( \n  {class_name},  \n  {class_name}Create,  \n  {class_name}Update,  \n  Response{class_name},  \n  {class_name}Adapter,  \n  Response{class_name}Adapter\n)")
             elif folder_type == "models":
                 lines.append(
                     f"from .{module_name} import {class_name}")
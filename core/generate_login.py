@@ -42,12 +42,13 @@ from typing import Any
 from fastapi import APIRouter, Body, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app import crud, models, schemas
 from app.api import deps
 from app.core import security
 from app.core.config import settings
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 from app.utils import (
     generate_password_reset_token,
     send_reset_password_email,
@@ -58,14 +59,14 @@ router = APIRouter()
 
 
 @router.post("/access-token", response_model=schemas.Token)
-def login_access_token(
+async def login_access_token(
     db: Session = Depends(deps.get_db), 
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.{user_table_name}.authenticate(
+    user = await crud.{user_table_name}.authenticate_async(
         db, email=form_data.username, password=form_data.password
     )
     if not user:
@@ -78,7 +79,9 @@ def login_access_token(
         expires_delta=access_token_expires,
     )
     token_data = deps.get_user(token)
-    user = crud.{user_table_name}.get(db=db, {lookup_field_for_test_token}=token_data.id)
+    user = await run_in_threadpool(
+        crud.{user_table_name}.get, db=db, {lookup_field_for_test_token}=token_data.id
+    )
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -125,28 +128,29 @@ def recover_password(email: str, db: Session = Depends(deps.get_db)) -> Any:
 
 
 @router.post("/reset-password/", response_model=schemas.Msg)
-def reset_password(
+async def reset_password(
     token: str = Body(...),
     new_password: str = Body(...),
     db: Session = Depends(deps.get_db),
 ) -> Any:
     """
-    Reset password
+    Reset password, bcrypt runs in the password pool without holding a threadpool thread
     """
     email = verify_password_reset_token(token)
     if not email:
         raise HTTPException(status_code=400, detail="Invalid token")
-    user = crud.{user_table_name}.get_by_email(db, email=email)
+    user = await run_in_threadpool(crud.{user_table_name}.get_by_email, db, email=email)
     if not user:
         raise HTTPException(
             status_code=404,
             detail="The user with this username does not exist in the system.",
         )
 {inactive_check_reset.rstrip()}
-    hashed_password = get_password_hash(new_password)
-    user.hashed_password = hashed_password
-    db.add(user)
-    db.commit()
+    hashed_password = await get_password_hash_async(new_password)
+    # through the CRUD so that `after_write` drops the user from `cache.user_cache`
+    await run_in_threadpool(
+        crud.{user_table_name}.update_by_id, db, id=user.id, obj_in={{"hashed_password": hashed_password}}
+    )
     return {{"msg": "Password updated successfully"}}
 '''
 
@@ -13,7 +13,7 @@ def generate_import(model: ClassModel):
     """Generate the necessary imports for the model."""
     imports = [
         "from app.db.base_class import Base",
-        "from sqlalchemy import Column, ForeignKey, DateTime, func, select, case, or_, and_",
+        "from sqlalchemy import Column, ForeignKey, DateTime, Index, func, select, case, or_, and_",
         "from sqlalchemy.orm import relationship, column_property, aliased",
         f"from sqlalchemy import {model.column_type_list}"
     ]
@@ -41,6 +41,18 @@ def generate_models(model: ClassModel):
     model_name = generate_class_name(model.name)
     models_lines = [f"\n\nclass {model_name}(Base):", f"    __tablename__ = '{table_name}'"]
 
+    # FULLTEXT indexes used by the `search` filter operator (MySQL)
+    searchable_columns = [column.name for column in model.attributes if column.is_searchable]
+    if searchable_columns:
+        models_lines.append("    __table_args__ = (")
+        for column_name in searchable_columns:
+            models_lines.append(
+                f"        Index('ix_{table_name}_{column_name}_fulltext', '{column_name}', mysql_prefix='FULLTEXT'),"
+            )
+        models_lines.append("    )")
+        # trigrams kept by CRUDBase (app.db.trigram) for the `ratio` operator
+        models_lines.append(f"    __trigram_columns__ = {tuple(searchable_columns)!r}")
+
     # Add default columns: created_at, updated_at, deleted_at
     default_columns = [
         AttributesModel(name="created_at", type="DateTime", is_required=True),
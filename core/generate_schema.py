@@ -89,7 +89,7 @@ def generate_import(model: ClassModel) -> str:
         "from datetime import datetime, time, date",
         "from typing import Any",
         "from typing import List, Optional",
-        "from pydantic import BaseModel, ConfigDict, field_validator",
+        "from pydantic import BaseModel, ConfigDict, TypeAdapter, field_validator",
     ]
 
     # Check if we need field validators
@@ -257,6 +257,19 @@ def generate_response_class(class_name: str, table_name: str) -> str:
         f"\nclass {schema_name}(BaseModel):",
         "    count: int",
         f"    data: Optional[List[{class_name}]]",
+        "    next_cursor: Optional[str] = None",
+        "",
+    ]
+    return "\n".join(schema_lines)
+
+
+def generate_adapters(table_name: str) -> str:
+    """Generate the TypeAdapters used by the routes to dump ORM rows straight to JSON."""
+    class_name = snake_to_camel(table_name)
+    schema_lines = [
+        "",
+        f"{class_name}Adapter = TypeAdapter({class_name})",
+        f"Response{class_name}Adapter = TypeAdapter(Response{class_name})",
         "",
     ]
     return "\n".join(schema_lines)
@@ -278,6 +291,7 @@ def generate_full_schema(model: ClassModel, table_name: str) -> str:
         generate_model_class_with_relation(model, in_db_base_schema, table_name),
         generate_in_db_class(in_db_base_schema, table_name),
         generate_response_class(f"{class_name}WithRelation", table_name),
+        generate_adapters(table_name),
     ]
     return "\n".join(schema_lines)
 
@@ -106,6 +106,8 @@ def generate_deps_tests(user_model_name: str, user_model: ClassModel, all_enums:
     # 1) get_current_user
     user_data_lines_current = "\n".join(_build_user_data_lines(required_email_value="testcurent@example.com"))
 
+    user_data_lines_cached = "\n".join(_build_user_data_lines(required_email_value="testcached@example.com"))
+
     # 2) get_current_active_user (force is_active True if field exists)
     user_data_lines_active = "\n".join(
         _build_user_data_lines(
@@ -155,8 +157,9 @@ def test_get_current_active_superuser(db, client):
     return f'''# Auto-generated tests for app.api.deps (model: {user_model_name})
 from fastapi import HTTPException
 from jose import jwt
-from app.api.deps import get_current_user, get_current_active_user, get_current_active_superuser
-from app.core import security
+from app.api.deps import decode_token, get_current_user, get_current_active_user, get_current_active_superuser
+from app import crud
+from app.core import cache, security
 from app.models import {user_model_name}
 
 
@@ -178,6 +181,33 @@ def test_get_current_user(db, client):
     assert current_user.{email_field} == user.{email_field}
 
 
+def test_decode_token_is_cached(client):
+    token = security.create_access_token(sub={{"id": "1", "email": "testtoken@example.com"}})
+
+    hits = cache.token_cache.hits
+    assert decode_token(token) is decode_token(token)
+    assert cache.token_cache.hits == hits + 1
+
+
+def test_get_current_user_cache_is_invalidated(db, client):
+    # Create a test user
+    user_data = {{
+{user_data_lines_cached}
+    }}
+    user = {user_model_name}(**user_data)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    token = security.create_access_token(sub={{"id": str(user.id), "email": user.{email_field}}})
+
+    # the first call caches the user, the update through the CRUD drops it
+    assert get_current_user(db=db, token=token).{email_field} == "testcached@example.com"
+    crud.{user_table_name}.update(db, db_obj=user, obj_in={{"{email_field}": "testrenamed@example.com"}})
+
+    current_user = get_current_user(db=db, token=token)
+    assert current_user.{email_field} == "testrenamed@example.com"
+
+
 def test_get_current_active_user(db, client):
     # Create a test user
     user_data = {{
@@ -1,15 +1,18 @@
-from typing import Generator
+import hashlib
+import time
+from typing import Any, Generator, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from app import crud, models, schemas
-from app.core import security
+from app.core import cache, security
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, read_session
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
@@ -24,9 +27,30 @@ def get_db() -> Generator:
         db.close()
 
 
-def get_current_user(
-        db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> models.User:
+def get_read_db(request: Request) -> Generator:
+    """
+    `get_db` for the read only routes: the session is bound to a read replica
+    when the project uses them, see `session.read_session`.
+    """
+    try:
+        db = read_session(request)
+        yield db
+    finally:
+        db.close()
+
+
+def decode_token(token: str) -> schemas.TokenPayload:
+    """
+    Verify a JWT and validate its payload.
+
+    Payloads are kept in `cache.token_cache`, keyed by the token hash, until
+    the token expires: the dependencies of a request (and the next requests)
+    sharing a token only verify it once. See `cache.token_cache.stats()`.
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    token_data = cache.token_cache.get(key)
+    if token_data is not None:
+        return token_data
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -37,41 +61,48 @@ def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    if expires_in is None or expires_in > 0:
+        cache.token_cache.set(key, token_data, ttl=expires_in)
+    return token_data
+
 
-    user = crud.user.get(db, id=token_data.id)
+def get_current_user(
+        db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
+) -> models.User:
+    token_data = decode_token(token)
+    user = get_cached_user(db, user_id=token_data.id)
     if not user:
         raise HTTPException(status_code=403, detail="User not found")
     return user
 
 
+def get_cached_user(db: Session, user_id: Any) -> Optional[models.User]:
+    """
+    Load a user by id, keeping its column values in `cache.user_cache` so that
+    authenticated requests don't query the user table every time.
+    """
+    data = cache.user_cache.get(user_id)
+    if data is not None:
+        user = models.User(**data)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    user = crud.user.get(db, id=user_id)
+    if user:
+        mapper = inspect(user).mapper
+        cache.user_cache.set(user_id, {attr.key: getattr(user, attr.key) for attr in mapper.column_attrs})
+    return user
+
+
 def get_user(
         token: str,
 ) -> models.User:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = schemas.TokenPayload(**payload)
-    except (jwt.JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    return token_data
+    return decode_token(token)
 
 
 def get_token_info(token: str = Depends(reusable_oauth2)):
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = schemas.TokenPayload(**payload)
-    except (jwt.JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    return token_data
+    return decode_token(token)
 
 
 def get_current_active_user(
@@ -0,0 +1,40 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(request: Request, version: Any) -> Optional[str]:
+    """
+    Weak ETag of the response to `request` from the `version` of the table it
+    reads (`CRUDBase.get_version`), None when the version is unknown.
+
+    The path and query parameters are part of the tag: another page or
+    another `fields` selection of the same rows gets another tag.
+    """
+    if version is None:
+        return None
+    query = sorted(request.query_params.multi_items())
+    digest = hashlib.sha256(repr((request.url.path, query, version)).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """Whether the `If-None-Match` header of `request` holds `etag` (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if etag is None or not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def with_etag(response: Response, etag: Optional[str]) -> Response:
+    if etag is not None:
+        response.headers["ETag"] = etag
+    return response
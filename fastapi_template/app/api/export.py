@@ -0,0 +1,85 @@
+import csv
+import io
+from itertools import islice
+from typing import Any, Iterator, Literal, Optional, Tuple, Type
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy import Result
+from sqlalchemy.orm import Session
+
+from app.crud.base import EXPORT_CHUNK_SIZE
+from app.db import session as db_session
+
+ExportFormat = Literal["ndjson", "csv"]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def export_response(
+        crud: Any,
+        schema: Type[BaseModel],
+        *,
+        where: Any = None,
+        columns: Optional[Tuple[str, ...]] = None,
+        format: ExportFormat = "ndjson",
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+        request: Optional[Request] = None,
+) -> StreamingResponse:
+    """
+    Stream the rows of `crud.export` as NDJSON or CSV.
+
+    Only the `columns` that are fields of `schema` are exported, so columns
+    hidden from the API (e.g. `hashed_password`) stay hidden.
+
+    The export runs on a session of its own, closed once the last row is
+    sent: the session of `deps.get_db` is closed before the response body
+    is streamed. It reads from a replica like `deps.get_read_db` for the
+    client of `request`.
+    """
+    columns = tuple(key for key in columns or crud.get_column_keys() if key in schema.model_fields)
+    db = db_session.read_session(request)
+    try:
+        result = crud.export(db, where=where, columns=columns, chunk_size=chunk_size)
+    except Exception:
+        db.close()
+        raise
+    table_name = crud.model.__tablename__
+    return StreamingResponse(
+        iter_export(db, result, format=format, chunk_size=chunk_size),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table_name}.{format}"'},
+    )
+
+
+def iter_export(
+        db: Session, result: Result, *, format: ExportFormat, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Encode `result` in `format`, one bytes chunk per `chunk_size` rows, then close `db`."""
+    try:
+        keys = list(result.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if format == "csv":
+            writer.writerow(keys)
+        while True:
+            rows = list(islice(result, chunk_size))
+            if not rows:
+                break
+            if format == "csv":
+                writer.writerows(rows)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                yield b"".join(to_json(dict(zip(keys, row))) + b"\n" for row in rows)
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    finally:
+        result.close()
+        db.close()
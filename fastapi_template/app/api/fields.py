@@ -0,0 +1,68 @@
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple, Type, get_args
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+from app.api.responses import json_response
+
+# Maximum number of narrowed response models kept per process
+FIELDS_MODEL_CACHE_SIZE = 256
+
+
+def parse_fields(fields: Optional[str], column_keys: Tuple[str, ...]) -> Optional[Tuple[str, ...]]:
+    """
+    Parse the `fields` query parameter (`name,price`) of the generated routes
+    into column names of the model, `id` is always included.
+
+    Returns None when every column is requested.
+    """
+    if fields is None or not fields.strip():
+        return None
+    return _parse_fields(fields, column_keys)
+
+
+@lru_cache(maxsize=FIELDS_MODEL_CACHE_SIZE)
+def _parse_fields(fields: str, column_keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in column_keys]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"fields: unknown field {', '.join(unknown)}")
+    return tuple(dict.fromkeys(["id", *names]))
+
+
+@lru_cache(maxsize=FIELDS_MODEL_CACHE_SIZE)
+def get_fields_model(
+        schema: Type[BaseModel], fields: Tuple[str, ...], column_keys: Tuple[str, ...]
+) -> Type[BaseModel]:
+    """
+    Copy of `schema` without the columns missing from `fields`, relations are
+    kept. The `data` list of a paginated response schema is narrowed instead.
+    """
+    narrowed = {}
+    for name, field in schema.model_fields.items():
+        if name == "data" and "data" not in column_keys:
+            item_schema = get_args(get_args(field.annotation)[0])[0]
+            item_model = get_fields_model(item_schema, fields, column_keys)
+            narrowed[name] = (Optional[List[item_model]], field)
+        elif name in fields or name not in column_keys:
+            narrowed[name] = (field.annotation, field)
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **narrowed,
+    )
+
+
+@lru_cache(maxsize=FIELDS_MODEL_CACHE_SIZE)
+def get_fields_adapter(
+        schema: Type[BaseModel], fields: Tuple[str, ...], column_keys: Tuple[str, ...]
+) -> TypeAdapter:
+    return TypeAdapter(get_fields_model(schema, fields, column_keys))
+
+
+def fields_response(
+        schema: Type[BaseModel], content: Any, *, fields: Tuple[str, ...], column_keys: Tuple[str, ...]
+) -> Response:
+    """JSON response of `content` (ORM objects or dicts) serialized with the narrowed `schema`."""
+    return json_response(get_fields_adapter(schema, fields, column_keys), content)
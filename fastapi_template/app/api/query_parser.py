@@ -0,0 +1,109 @@
+import ast
+import json
+from functools import lru_cache
+from typing import Any, List, Optional
+
+from fastapi import HTTPException
+
+# Limits applied to the raw `where` / `relation` query strings before parsing
+MAX_QUERY_LENGTH = 10000
+MAX_QUERY_DEPTH = 10
+MAX_QUERY_ITEMS = 100
+QUERY_PARSE_CACHE_SIZE = 1024
+
+EMPTY_VALUES = ("", "[]")
+
+
+def parse_where(where: Optional[str]) -> List:
+    """
+    Parse the `where` query parameter of the generated list/detail routes.
+
+    Accepts compact JSON (`[{"key":"id","operator":"==","value":1}]`) or the
+    Python literal syntax used so far. Each item is a condition dict or a
+    list of condition dicts (OR group).
+    """
+    conditions = parse_query_list(where, "where")
+    for condition in conditions:
+        group = condition if isinstance(condition, list) else [condition]
+        for item in group:
+            if not isinstance(item, dict) or "key" not in item or "operator" not in item:
+                raise HTTPException(
+                    status_code=400,
+                    detail="where: each condition needs a key and an operator",
+                )
+    return conditions
+
+
+def parse_relation(relation: Optional[str]) -> List[str]:
+    """Parse the `relation` query parameter: a list of dotted relation paths."""
+    return parse_string_list(relation, "relation")
+
+
+def parse_string_list(raw: Optional[str], name: str) -> List[str]:
+    """Parse a query parameter holding a list of strings (`group_by`, `metrics`...)."""
+    items = parse_query_list(raw, name)
+    if not all(isinstance(item, str) for item in items):
+        raise HTTPException(status_code=400, detail=f"{name}: expected a list of strings")
+    return items
+
+
+def parse_query_list(raw: Optional[str], name: str) -> List:
+    """
+    Parse `raw` into a list, rejecting oversized or too deeply nested payloads.
+
+    Parsed values are cached and shared between requests: the returned list is
+    a copy but the items inside must not be modified.
+    """
+    if raw is None or raw.strip() in EMPTY_VALUES:
+        return []
+    if len(raw) > MAX_QUERY_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{name}: longer than {MAX_QUERY_LENGTH} characters",
+        )
+    try:
+        result = _parse(raw)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        raise HTTPException(status_code=400, detail=f"{name}: invalid value")
+    if not isinstance(result, list):
+        raise HTTPException(status_code=400, detail=f"{name}: expected a list")
+    if len(result) > MAX_QUERY_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{name}: more than {MAX_QUERY_ITEMS} items",
+        )
+    return list(result)
+
+
+@lru_cache(maxsize=QUERY_PARSE_CACHE_SIZE)
+def _parse(raw: str) -> Any:
+    if get_nesting_depth(raw) > MAX_QUERY_DEPTH:
+        raise ValueError(f"nested deeper than {MAX_QUERY_DEPTH} levels")
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return ast.literal_eval(raw)
+
+
+def get_nesting_depth(raw: str) -> int:
+    """Maximum bracket nesting of `raw`, ignoring brackets inside quoted strings."""
+    depth = 0
+    max_depth = 0
+    quote = None
+    escaped = False
+    for char in raw:
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "[{(":
+            depth += 1
+            max_depth = max(max_depth, depth)
+        elif char in "]})":
+            depth -= 1
+    return max_depth
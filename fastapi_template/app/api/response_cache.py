@@ -0,0 +1,97 @@
+import hashlib
+from typing import Callable, Iterable, Optional
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from sqlalchemy import Table, event
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.sql.util import find_tables
+
+from app.api.etag import etag_matches, not_modified
+from app.core import cache
+
+# header telling whether the response comes from `cache.response_cache`
+RESPONSE_CACHE_HEADER = "X-Cache"
+
+# headers of the original response not replayed on a hit
+UNCACHED_HEADERS = ("content-length", "set-cookie")
+
+# larger responses are not cached
+MAX_CACHED_RESPONSE_SIZE = 1024 * 1024
+
+
+def response_cache_key(request: Request) -> str:
+    """
+    Key of the response of `request`: path, query parameters sorted by name,
+    and the credentials of the user, so users never share an entry.
+    """
+    query = urlencode(sorted(request.query_params.multi_items()))
+    scope = request.headers.get("authorization", "")
+    return hashlib.sha256(f"{request.url.path}?{query}\n{scope}".encode()).hexdigest()
+
+
+def is_fresh(versions: dict) -> bool:
+    return all(cache.table_versions.get(table) == version for table, version in versions.items())
+
+
+@event.listens_for(Session, "do_orm_execute")
+def record_statement_tables(orm_execute_state: ORMExecuteState) -> None:
+    """Record the tables of the SELECT statements run while a response may be cached."""
+    if cache.read_versions.get() is None or not orm_execute_state.is_select:
+        return
+    tables = find_tables(orm_execute_state.statement, check_columns=True)
+    cache.record_read(*(table.name for table in tables if isinstance(table, Table)))
+
+
+def cache_responses(prefixes: Optional[Iterable[str]] = None) -> Callable:
+    """
+    HTTP middleware caching the JSON responses of the GET routes under
+    `prefixes` (every route by default) in `cache.response_cache`.
+
+    An entry keeps the version of each table read to build it (queries and
+    `relation` includes) and is served while none of them changed, the
+    writes of `CRUDBase` bump these versions. Responses that read no table
+    are not cached. A hit replays the headers of the original response
+    (its `ETag`) and answers a matching `If-None-Match` with a 304.
+    """
+    prefixes = tuple(prefixes or ("/",))
+
+    async def middleware(request: Request, call_next: Callable) -> Response:
+        if request.method != "GET" or not request.url.path.startswith(prefixes):
+            return await call_next(request)
+        key = response_cache_key(request)
+        entry = cache.response_cache.get(key)
+        if entry is not None and is_fresh(entry["versions"]):
+            etag = entry["headers"].get("etag")
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            return Response(
+                content=entry["body"],
+                status_code=entry["status_code"],
+                headers={**entry["headers"], RESPONSE_CACHE_HEADER: "HIT"},
+            )
+
+        token = cache.read_versions.set({})
+        try:
+            response = await call_next(request)
+            versions = cache.read_versions.get()
+        finally:
+            cache.read_versions.reset(token)
+        media_type = response.headers.get("content-type", "")
+        if response.status_code != 200 or not versions or not media_type.startswith("application/json"):
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in UNCACHED_HEADERS}
+        if len(body) <= MAX_CACHED_RESPONSE_SIZE:
+            cache.response_cache.set(key, {
+                "versions": versions,
+                "body": body,
+                "status_code": response.status_code,
+                "headers": headers,
+            })
+        response = Response(content=body, status_code=response.status_code, headers=response.headers)
+        response.headers[RESPONSE_CACHE_HEADER] = "MISS"
+        return response
+
+    return middleware
@@ -0,0 +1,46 @@
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+class LoadedState:
+    """
+    Read only view of the loaded attributes of an ORM object.
+
+    Validating it `from_attributes` never triggers a lazy load: attributes
+    that were not loaded (deferred columns, relations not requested) are
+    missing, so their schema default is used, like `jsonable_encoder` does.
+    """
+
+    __slots__ = ("_loaded",)
+
+    def __init__(self, obj: Any):
+        self._loaded = obj.__dict__
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return loaded_state(self._loaded[name])
+        except KeyError:
+            raise AttributeError(name)
+
+
+def loaded_state(value: Any) -> Any:
+    """Wrap the ORM objects of `value` (also inside lists and dicts) in `LoadedState`."""
+    if hasattr(value, "_sa_instance_state"):
+        return LoadedState(value)
+    if isinstance(value, list):
+        return [loaded_state(item) for item in value]
+    if isinstance(value, dict):
+        return {key: loaded_state(item) for key, item in value.items()}
+    return value
+
+
+def json_response(adapter: TypeAdapter, content: Any) -> Response:
+    """
+    Validate `content` (ORM objects, dicts) with `adapter` and dump it to JSON
+    bytes in one step, skipping `jsonable_encoder` and the validation of the
+    route `response_model`.
+    """
+    value = adapter.validate_python(loaded_state(content), from_attributes=True)
+    return Response(content=adapter.dump_json(value), media_type="application/json")
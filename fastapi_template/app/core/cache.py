@@ -0,0 +1,119 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache.
+
+    Entries expire after `ttl` seconds (or the ttl given to `set`) and the
+    least recently used entry is dropped once `maxsize` entries are stored.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] <= time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TableVersions:
+    """
+    Thread-safe in-process version counter per table.
+
+    `CRUDBase.after_write` bumps the version of the written table, a cached
+    response keeps the versions of the tables it read and is only served
+    while none of them changed. `epoch` identifies the counters: versions of
+    another process (or of a previous run) are never mistaken for these ones.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, table: str) -> int:
+        return self._versions.get(table, 0)
+
+    def bump(self, table: str) -> None:
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+
+
+# Column values of the authenticated users keyed by token subject (user id),
+# filled by `deps.get_current_user` and cleared by the user CRUD on writes.
+# Any object with the get/set/delete/clear methods of `TTLCache` can replace it
+# (`cache.user_cache = MySharedBackend()`) to share entries between processes.
+USER_CACHE_TTL = 60
+user_cache = TTLCache(maxsize=10000, ttl=USER_CACHE_TTL)
+
+# Decoded JWT payloads keyed by the sha256 of the token, each entry lives until
+# the token expiration (`deps.decode_token`).
+TOKEN_CACHE_TTL = 60 * 60
+token_cache = TTLCache(maxsize=10000, ttl=TOKEN_CACHE_TTL)
+
+# Responses of the GET routes keyed by route, query and user (app/api/response_cache.py),
+# invalidated by `table_versions`. Replace both with shared backends (`get`/`set` and
+# `epoch`/`get`/`bump`) to share the cached responses and the ETags between processes.
+RESPONSE_CACHE_TTL = 60
+response_cache = TTLCache(maxsize=1024, ttl=RESPONSE_CACHE_TTL)
+table_versions = TableVersions()
+
+# Clients that wrote recently and read from the primary (app/db/replica.py), keyed
+# by the sha256 of their Authorization header, each entry lives `READ_YOUR_WRITES_SECONDS`.
+# Replace it with a shared backend when the API runs in several processes.
+RECENT_WRITES_TTL = 5
+recent_writes = TTLCache(maxsize=10000, ttl=RECENT_WRITES_TTL)
+
+# table -> version when first read by the current request, None outside a cached route
+read_versions: ContextVar[Optional[Dict[str, Any]]] = ContextVar("read_versions", default=None)
+
+
+def record_read(*tables: str) -> None:
+    """Add `tables` to the tables read by the current request, with their current version."""
+    versions = read_versions.get()
+    if versions is None:
+        return
+    for table in tables:
+        if table not in versions:
+            versions[table] = table_versions.get(table)
@@ -1,14 +1,34 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Any, Callable
 
+from fastapi import HTTPException
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# emitted in the config of the projects generated with authentication only
+PASSWORD_BCRYPT_ROUNDS = getattr(settings, "PASSWORD_BCRYPT_ROUNDS", 12)
+PASSWORD_HASH_WORKERS = getattr(settings, "PASSWORD_HASH_WORKERS", 4)
+PASSWORD_HASH_QUEUE_SIZE = getattr(settings, "PASSWORD_HASH_QUEUE_SIZE", 100)
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=PASSWORD_BCRYPT_ROUNDS
+)
 
 ALGORITHM = "HS256"
 
+# bcrypt runs in its own small pool so that a burst of logins can't take all
+# the threads serving the rest of the API
+password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password"
+)
+_password_stats = {"pending": 0, "running": 0, "completed": 0, "rejected": 0}
+_password_stats_lock = threading.Lock()
+
 
 def create_access_token(sub: dict, expires_delta: timedelta = None) -> str:
     to_encode = sub.copy()
@@ -29,3 +49,55 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.wrap_future(
+        submit_password_task(verify_password, plain_password, hashed_password)
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.wrap_future(submit_password_task(get_password_hash, password))
+
+
+def run_in_password_pool(func: Callable, *args: Any) -> Any:
+    """
+    Run `func` in the password pool from sync code and wait for the result.
+
+    The calling thread is blocked meanwhile, only the number of concurrent
+    bcrypt runs is bounded: routes await `get_password_hash_async` or
+    `verify_password_async` instead.
+    """
+    return submit_password_task(func, *args).result()
+
+
+def submit_password_task(func: Callable, *args: Any):
+    with _password_stats_lock:
+        if _password_stats["pending"] >= PASSWORD_HASH_QUEUE_SIZE:
+            _password_stats["rejected"] += 1
+            raise HTTPException(
+                status_code=503, detail="Too many authentication requests, retry later"
+            )
+        _password_stats["pending"] += 1
+
+    def task():
+        _update_password_stats(pending=-1, running=1)
+        try:
+            return func(*args)
+        finally:
+            _update_password_stats(running=-1, completed=1)
+
+    return password_executor.submit(task)
+
+
+def _update_password_stats(**changes: int) -> None:
+    with _password_stats_lock:
+        for key, change in changes.items():
+            _password_stats[key] += change
+
+
+def password_pool_stats() -> dict:
+    """Queue metrics of the password pool: pending, running, completed and rejected tasks."""
+    with _password_stats_lock:
+        return {"workers": PASSWORD_HASH_WORKERS, **_password_stats}
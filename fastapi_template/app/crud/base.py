@@ -1,24 +1,407 @@
 import ast
+import base64
+import io
 import json
-from datetime import datetime, timedelta, date
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from datetime import datetime, timedelta, date, time
+from functools import lru_cache, partial
+from itertools import islice
+from operator import eq, ge, le
+from typing import Any, Callable, Dict, Generic, Iterable, Iterator, List, Literal, Optional, Tuple, Type, TypeVar, Union, get_args
 import re
 import regex
 from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import and_, asc, delete, desc, extract, func, inspect, or_, case
+from sqlalchemy import Boolean, Result, and_, asc, delete, desc, event, extract, func, insert, inspect, or_, case, select, text, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 from sqlalchemy.orm import (
+    ColumnProperty,
+    RelationshipProperty,
     Session,
+    aliased,
     joinedload,
     load_only,
+    selectinload,
+    subqueryload,
 )
+from app.core import cache
+from app.core.cache import TTLCache
 from app.db.base_class import Base
+from app.db.trigram import Trigram, trigrams
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# Maximum number of compiled filter plans kept per process
+FILTER_PLAN_CACHE_SIZE = 512
+
+CountMode = Literal["exact", "cached", "estimated"]
+COUNT_MODES = get_args(CountMode)
+
+# Seconds a `cached` count stays valid
+COUNT_CACHE_TTL = 30
+count_cache = TTLCache(maxsize=1024, ttl=COUNT_CACHE_TTL)
+
+# Rows sent per executemany INSERT by `bulk_create`
+BULK_INSERT_BATCH_SIZE = 1000
+
+# Rows soft deleted per UPDATE by `soft_delete_where`
+SOFT_DELETE_CHUNK_SIZE = 1000
+
+# Ids sent per DELETE by `bulk_remove`
+BULK_DELETE_CHUNK_SIZE = 1000
+
+# Rows indexed per transaction by `rebuild_trigrams`
+TRIGRAM_REBUILD_CHUNK_SIZE = 1000
+
+# Rows fetched at a time from the server-side cursor of `export`
+EXPORT_CHUNK_SIZE = 1000
+
+# metric name -> SQL aggregate function used by `aggregate`
+AGGREGATE_FUNCTIONS = {
+    "count": func.count,
+    "sum": func.sum,
+    "avg": func.avg,
+    "min": func.min,
+    "max": func.max,
+}
+
+# Maximum number of groups returned by `aggregate`
+MAX_AGGREGATE_GROUPS = 1000
+
+# columns that can not be grouped or aggregated
+AGGREGATE_EXCLUDED_COLUMNS = ("hashed_password",)
+
+# loader used for a relation path part suffixed with `:<strategy>`, e.g. `items:select`
+RELATION_LOADERS = {
+    "joined": joinedload,
+    "select": selectinload,
+    "subquery": subqueryload,
+}
+
+# `Session.info` key of the tables written in the current transaction
+WRITTEN_TABLES_KEY = "written_tables"
+
+# name -> function(model, *arguments) returning the expression to sort on for
+# the `@name(arguments)` part of a dotted `order_by`, e.g. `category.@lower("name")`
+ORDER_BY_METHODS: Dict[str, Callable[..., Any]] = {}
+
+# `@name(arguments)` part of a dotted `order_by`
+ORDER_BY_METHOD_PATTERN = re.compile(r"@(\w+)\((.*)\)")
+
+# `{id,name}` column block of a relation part, before or after its `:strategy`
+RELATION_COLUMNS_PATTERN = re.compile(r"\{([^}]*)\}")
+
+# first server version supporting `COUNT(*) OVER()` per dialect
+WINDOW_FUNCTION_MIN_VERSIONS = {
+    "mysql": (8, 0),
+    "mariadb": (10, 2),
+    "postgresql": (8, 4),
+    "sqlite": (3, 25),
+}
+
+
+def extract_condition(field, operator):
+    def condition(crud, attribute, value):
+        if value is None:
+            return extract(field, attribute).is_(None)
+        return operator(extract(field, attribute), value)
+    return condition
+
+
+def day_start(attribute, day: date):
+    """Start of `day` typed like `attribute`: a date for DATE columns, a datetime otherwise."""
+    try:
+        python_type = attribute.type.python_type
+    except (AttributeError, NotImplementedError):
+        python_type = datetime
+    if python_type is date:
+        return day
+    return datetime.combine(day, time.min)
+
+
+def date_range_condition(attribute, start: date, end: date):
+    """
+    `start <= attribute < end` on whole days. Unlike `func.date(attribute)` or
+    `extract(..., attribute)`, it can use an index on `attribute`.
+    """
+    return and_(
+        attribute >= day_start(attribute, start),
+        attribute < day_start(attribute, end),
+    )
+
+
+def next_month(day: date) -> date:
+    """First day of the month following the month of `day`."""
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def year_condition(operator):
+    def condition(crud, attribute, value):
+        if value is None:
+            return extract("year", attribute).is_(None)
+        year = int(value)
+        if operator is le:
+            return attribute < day_start(attribute, date(year + 1, 1, 1))
+        if operator is ge:
+            return attribute >= day_start(attribute, date(year, 1, 1))
+        return date_range_condition(attribute, date(year, 1, 1), date(year + 1, 1, 1))
+    return condition
+
+
+def date_condition(crud, attribute, value):
+    date_value = datetime.strptime(value, "%Y-%m-%d").date()
+    return date_range_condition(attribute, date_value, date_value + timedelta(days=1))
+
+
+def last_24h_condition(crud, attribute, value):
+    now = datetime.now()
+    twenty_four_hours_ago = now - timedelta(hours=24)
+    return attribute.between(twenty_four_hours_ago, now)
+
+
+def between_date_condition(crud, attribute, value):
+    date_split = value.split(",")
+    date_1 = datetime.strptime(
+        crud.getStringDateTimeFormat(date_split[0]),
+        "%Y-%m-%d %H:%M",
+    ).date()
+    date_2 = datetime.strptime(
+        crud.getStringDateTimeFormat(date_split[1]),
+        "%Y-%m-%d %H:%M",
+    ).date()
+    return attribute.between(date_1, date_2)
+
+
+def json_condition(crud, attribute, value, json_key):
+    col_value = func.json_extract(func.json_unquote(attribute), json_key)
+    if value == "isNull":
+        return or_(
+            col_value.is_(None),
+            col_value.is_(False),
+            col_value.like("false"),
+        )
+    elif value == "isNotNull":
+        return col_value.isnot(None)
+    return col_value.like(value)
+
+
+class full_text_search(FunctionElement):
+    """
+    `search` operator: `MATCH (col) AGAINST (value IN BOOLEAN MODE)` on
+    MySQL/MariaDB, backed by the FULLTEXT index generated for the columns
+    flagged `is_searchable`. Other databases (SQLite tests) get a LIKE.
+    """
+    type = Boolean()
+    name = "full_text_search"
+    inherit_cache = True
+
+
+@compiles(full_text_search)
+def compile_full_text_search(element, compiler, **kw):
+    column, value = element.clauses
+    return compiler.process(column.contains(value), **kw)
+
+
+@compiles(full_text_search, "mysql")
+@compiles(full_text_search, "mariadb")
+def compile_full_text_search_mysql(element, compiler, **kw):
+    column, value = element.clauses
+    return compiler.process(column.match(value), **kw)
+
+
+def search_condition(crud, attribute, value):
+    return full_text_search(attribute, value)
+
+
+def ratio_condition(crud, attribute, value):
+    ratio = func.levenshtein_ratio(
+        func.upper(attribute), func.upper(value[0])
+    ) > (value[1] / 100)
+    candidates = trigram_candidates(attribute, value[0], value[1] / 100)
+    if candidates is None:
+        return ratio
+    return and_(attribute.class_.id.in_(candidates), ratio)
+
+
+def trigram_candidates(attribute, text: str, min_ratio: float):
+    """
+    Ids of the rows sharing enough trigrams with `text` to reach `min_ratio`,
+    None when `attribute` has no trigrams or when no row can be excluded.
+
+    A row reaching the ratio is at most `len(text) / min_ratio` long, so at
+    most `d = (1 - min_ratio) * len(text) / min_ratio` edits away from `text`;
+    each edit changes at most 3 trigrams, so it shares at least
+    `len(trigrams(text)) - 3 * d` of them.
+    """
+    model = getattr(attribute, "class_", None)
+    key = getattr(attribute, "key", None)
+    if key not in getattr(model, "__trigram_columns__", ()) or not text or min_ratio <= 0:
+        return None
+    grams = trigrams(text)
+    max_edits = int((1 - min_ratio) * len(text) / min_ratio)
+    min_shared = len(grams) - 3 * max_edits
+    if min_shared <= 0:
+        return None
+    return (
+        select(Trigram.row_id)
+        .where(
+            Trigram.table_name == model.__tablename__,
+            Trigram.column_name == key,
+            Trigram.gram.in_(grams),
+        )
+        .group_by(Trigram.row_id)
+        .having(func.count() >= min_shared)
+    )
+
+
+def unknown_condition(crud, attribute, value):
+    return None
+
+
+# operator name -> builder(crud, attribute, value), "json.<key>" is handled apart
+FILTER_OPERATORS = {
+    "==": lambda crud, attribute, value: attribute == value,
+    "!=": lambda crud, attribute, value: attribute != value,
+    ">": lambda crud, attribute, value: attribute > value,
+    "<": lambda crud, attribute, value: attribute < value,
+    "like": lambda crud, attribute, value: attribute.like("%" + value + "%"),
+    "search": search_condition,
+    "month": extract_condition("month", eq),
+    "date": date_condition,
+    "last_24h": last_24h_condition,
+    "between_date": between_date_condition,
+    "year": year_condition(eq),
+    "lower_or_equal_year": year_condition(le),
+    "greater_or_equal_year": year_condition(ge),
+    "week": extract_condition("week", eq),
+    "isNull": lambda crud, attribute, value: attribute.is_(None),
+    "isNotNull": lambda crud, attribute, value: attribute.isnot(None),
+    "isTrue": lambda crud, attribute, value: attribute.is_(True),
+    "isFalse": lambda crud, attribute, value: attribute.is_(False),
+    "notIn": lambda crud, attribute, value: attribute.notin_(value),
+    "in": lambda crud, attribute, value: attribute.in_(value),
+    "in_date_range": lambda crud, attribute, value: crud.get_date_filter_by_range(
+        date_column=attribute, date_list=value
+    ),
+    "ratio": ratio_condition,
+}
+
+
+def split_order_by(order_by: str) -> List[str]:
+    """Parts of a dotted `order_by`, dots inside the arguments of a method are kept."""
+    return re.split(r"\.(?![^(]*\))", order_by)
+
+
+def parse_order_by_method(segment: str) -> Tuple[Callable[..., Any], tuple]:
+    """
+    Function registered in `ORDER_BY_METHODS` and arguments of a
+    `@name(arguments)` part, the arguments are Python literals.
+    """
+    match = ORDER_BY_METHOD_PATTERN.fullmatch(segment)
+    function = ORDER_BY_METHODS.get(match.group(1)) if match else None
+    if function is None:
+        raise HTTPException(status_code=400, detail=f"order_by: unknown method {segment}")
+    arguments = match.group(2).strip()
+    try:
+        return function, ast.literal_eval(f"({arguments},)") if arguments else ()
+    except (ValueError, SyntaxError):
+        raise HTTPException(status_code=400, detail=f"order_by: invalid arguments {segment}")
+
+
+def add_written_tables(session: Session, tables: Iterable[str]) -> None:
+    session.info.setdefault(WRITTEN_TABLES_KEY, set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def record_flushed_tables(session: Session, flush_context: Any) -> None:
+    """Record the tables of the objects inserted, updated or deleted by a flush."""
+    objects = [*session.new, *session.dirty, *session.deleted]
+    add_written_tables(session, {inspect(obj).mapper.local_table.name for obj in objects})
+
+
+@event.listens_for(Session, "do_orm_execute")
+def record_statement_tables(orm_execute_state: Any) -> None:
+    """Record the table of the INSERT, UPDATE and DELETE statements run on a session."""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            add_written_tables(orm_execute_state.session, [table.name])
+
+
+@event.listens_for(Session, "after_commit")
+def bump_written_tables(session: Session) -> None:
+    """
+    Bump the tables written by the committed transaction: a response cached
+    between a write and its commit read the old rows.
+    """
+    for table in session.info.pop(WRITTEN_TABLES_KEY, ()):
+        cache.table_versions.bump(table)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_written_tables(session: Session) -> None:
+    session.info.pop(WRITTEN_TABLES_KEY, None)
+
+
+def encode_cursor(values: List) -> str:
+    data = json.dumps(jsonable_encoder(values), separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def iter_ids(ids: Union[str, bytes, Iterable], cast: Optional[Callable] = None) -> Iterator:
+    """
+    Yield the ids of a list, a JSON array or a newline separated text/stream
+    (e.g. an open file), blank lines are skipped.
+    """
+    if isinstance(ids, bytes):
+        ids = ids.decode()
+    try:
+        if isinstance(ids, str):
+            ids = json.loads(ids) if ids.lstrip().startswith("[") else io.StringIO(ids)
+        for value in ids:
+            if isinstance(value, bytes):
+                value = value.decode()
+            if isinstance(value, str):
+                value = value.strip()
+                if not value:
+                    continue
+            yield cast(value) if cast else value
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid ids")
+
+
+def parse_cursor_value(column, value):
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+        if python_type is time:
+            return time.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
@@ -31,6 +414,10 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         * `schema`: A Pydantic model (schema) class
         """
         self.model = model
+        # bounded LRU of the filter plans of this CRUD object (`compile_filter_plan`)
+        self.get_filter_plan = lru_cache(maxsize=FILTER_PLAN_CACHE_SIZE)(self.compile_filter_plan)
+        # filled on first use, the mappers are not configured yet when the CRUD objects are built
+        self._column_keys: Optional[Tuple[str, ...]] = None
 
     def get(
             self,
@@ -39,8 +426,11 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             where: Any = None,
             relations=None,
             include_deleted=False,
+            base_columns=None,
     ) -> Optional[ModelType]:
         query = db.query(self.model).filter(self.model.id == id)
+        if base_columns is not None and len(base_columns) > 0:
+            query = query.options(self.get_load_only(base_columns))
 
         if where is not None and isinstance(where, list):
             conditions = self.get_full_condition(
@@ -56,9 +446,17 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return query.first()
 
     def get_all_relations(self, relations: List):
-        return [self.get_joined_load(x) for x in relations]
+        return self.get_joined_load(relations)
 
     def get_joined_load(self, relations):
+        """
+        Loader options for dotted relation paths (`category.owner{id,name}`).
+
+        Collections are loaded with `selectinload` (one extra query, no row
+        multiplication under `offset`/`limit`), many-to-one relations with
+        `joinedload`. A part suffixed with `:joined`, `:select` or `:subquery`
+        (e.g. `items:joined.product`, `items:select{id}`) forces the strategy.
+        """
         def process_relation(relation):
             parts = relation.split(".")
             previous_model = self.model
@@ -67,22 +465,39 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             for i in range(len(parts)):
                 part = parts[i]
 
-                if "{" in part and "}" in part:
-                    relationship, columns = part.split("{")
-                    columns = columns.rstrip("}").split(",")
-                else:
-                    relationship = part
-                    columns = []
+                # the column block first, so that it may follow the strategy
+                columns = []
+                match = RELATION_COLUMNS_PATTERN.search(part)
+                if match:
+                    columns = match.group(1).split(",")
+                    part = part[:match.start()] + part[match.end():]
+
+                relationship = part
+                strategy = None
+                if ":" in part:
+                    relationship, strategy = part.rsplit(":", 1)
+                    if strategy not in RELATION_LOADERS:
+                        raise HTTPException(
+                            status_code=400,
+                            detail=f"relation: unknown loading strategy {strategy}",
+                        )
 
                 attr = getattr(previous_model, relationship)
 
+                if strategy is None:
+                    strategy = "select" if attr.property.uselist else "joined"
+                loader = RELATION_LOADERS[strategy]
+
                 if result:
-                    result = result.joinedload(attr)
+                    result = getattr(result, loader.__name__)(attr)
                 else:
-                    result = joinedload(attr)
+                    result = loader(attr)
 
                 # Use current model BEFORE updating previous_model
                 current_model = attr.property.mapper.class_
+                cache.record_read(current_model.__tablename__)
+                if attr.property.secondary is not None:
+                    cache.record_read(attr.property.secondary.name)
 
                 if columns:
                     result = result.load_only(*[getattr(current_model, col) for col in columns])
@@ -168,7 +583,6 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             )
 
     def sub_get_condition_deep_multiple(self, condition):
-        keys = self.get_key_parts(condition["key"])
         operators = condition["operator"].split(",")
         values = [condition.get("value", None)]
         match = condition.get("match", "and")
@@ -178,8 +592,8 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             else:
                 values = str(values[0]).split(",")
         condition_operator = or_ if match == "or" else and_
-        current_idx = {"value": 0}
-        attrs = self.get_attrs(self.model, current_idx, keys, operators, values)
+        plan = self.get_filter_plan(condition["key"], condition["operator"])
+        attrs = self.bind_filter_plan(plan, values)
         cond = self.get_cond_reccur(attrs=attrs, condition_operator=condition_operator)
         return cond
 
@@ -191,9 +605,22 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             formatted_string = parsed_date.strftime("%Y-%m-%d %H:%M")
         return formatted_string
 
-    def get_attrs(self, parent_model, current_idx, keys, operators, values):
+    def compile_filter_plan(self, key: str, operator: str) -> tuple:
+        """
+        Compile the shape of a condition (key path + operators) into a plan.
+
+        The plan holds the resolved relationship/column attributes and the
+        operator builders, values are bound later by `bind_filter_plan`.
+        `get_filter_plan` is its cached version: each CRUD object keeps its
+        own LRU of `FILTER_PLAN_CACHE_SIZE` plans keyed by `(key, operator)`.
+        """
+        keys = self.get_key_parts(key)
+        operators = operator.split(",")
+        return self.compile_attrs(self.model, {"value": 0}, keys, operators)
+
+    def compile_attrs(self, parent_model, current_idx, keys, operators) -> tuple:
         previous_model = parent_model
-        attrs = []
+        steps = []
         for i in range(0, len(keys)):
             if i < len(keys) - 1:
                 key_temp = keys[i]
@@ -203,127 +630,47 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                     all = True
                 attr = getattr(previous_model, key_temp)
                 previous_model = attr.property.mapper.class_
-                attrs.append((attr, all))
+                steps.append(("relation", attr, all))
+            elif isinstance(keys[i], str):
+                idx = current_idx["value"]
+                is_method = keys[i].startswith("@")
+                attribute = getattr(previous_model, keys[i].replace("@", ""))
+                builder = self.get_operator_builder(operators[idx])
+                steps.append(("filter", attribute, is_method, builder, idx))
+                current_idx["value"] = idx + 1
             else:
-                if isinstance(keys[i], str):
-                    idx = current_idx["value"]
-                    operator = operators[idx]
-                    value = values[idx]
-                    filter_condition = None
-                    if keys[i].startswith("@"):
-                        method_name = keys[i]
-                        args = value["args"]
-                        value = value["operator_value"]
-                        method = getattr(previous_model, method_name.replace("@", ""))
-                        attribute = method(*args)
-                    else:
-                        attribute = getattr(previous_model, keys[i])
-
-                    if operator == "==":
-                        filter_condition = attribute == value
-                    elif operator == "!=":
-                        filter_condition = attribute != value
-                    elif operator == ">":
-                        filter_condition = attribute > value
-                    elif operator == "<":
-                        filter_condition = attribute < value
-                    elif operator == "like":
-                        filter_condition = attribute.like("%" + value + "%")
-                    elif operator == "month":
-                        if value is None:
-                            filter_condition = extract("month", attribute).is_(None)
-                        else:
-                            filter_condition = extract("month", attribute) == value
-                    elif operator == "date":
-                        date_value = datetime.strptime(value, "%Y-%m-%d").date()
-                        filter_condition = func.date(attribute) == date_value
-                    elif operator == "last_24h":
-                        now = datetime.now()
-                        twenty_four_hours_ago = now - timedelta(hours=24)
-
-                        filter_condition = attribute.between(twenty_four_hours_ago, now)
-
-                    elif operator == "between_date":
-                        date_split = value.split(",")
-                        date_1 = datetime.strptime(
-                            self.getStringDateTimeFormat(date_split[0]),
-                            "%Y-%m-%d %H:%M",
-                        ).date()
-                        date_2 = datetime.strptime(
-                            self.getStringDateTimeFormat(date_split[1]),
-                            "%Y-%m-%d %H:%M",
-                        ).date()
-                        filter_condition = attribute.between(date_1, date_2)
-                    elif operator == "year":
-                        if value is None:
-                            filter_condition = extract("year", attribute).is_(None)
-                        else:
-                            filter_condition = extract("year", attribute) == value
-                    elif operator == "lower_or_equal_year":
-                        if value is None:
-                            filter_condition = extract("year", attribute).is_(None)
-                        else:
-                            filter_condition = extract("year", attribute) <= value
-                    elif operator == "greater_or_equal_year":
-                        if value is None:
-                            filter_condition = extract("year", attribute).is_(None)
-                        else:
-                            filter_condition = extract("year", attribute) >= value
-                    elif operator == "week":
-                        if value is None:
-                            filter_condition = extract("week", attribute).is_(None)
-                        else:
-                            filter_condition = extract("week", attribute) == value
-                    elif operator == "isNull":
-                        filter_condition = attribute.is_(None)
-                    elif operator == "isNotNull":
-                        filter_condition = attribute.isnot(None)
-                    elif operator == "isTrue":
-                        filter_condition = attribute.is_(True)
-                    elif operator == "isFalse":
-                        filter_condition = attribute.is_(False)
-                    elif operator == "notIn":
-                        filter_condition = attribute.notin_(value)
-                    elif operator == "in":
-                        filter_condition = attribute.in_(value)
-                    elif operator == "in_date_range":
-                        filter_condition = self.get_date_filter_by_range(
-                            date_column=attribute, date_list=value
-                        )
-                    elif operator.startswith("json."):
-                        json_key = "$." + operator.split(".")[1]
-                        col_value = func.json_extract(
-                            func.json_unquote(attribute), json_key
-                        )
-                        if value == "isNull":
-                            filter_condition = or_(
-                                col_value.is_(None),
-                                col_value.is_(False),
-                                col_value.like("false"),
-                            )
-                        elif value == "isNotNull":
-                            filter_condition = col_value.isnot(None)
-                        else:
-                            filter_condition = col_value.like(value)
-                    elif operator == "ratio":
-                        filter_condition = func.levenshtein_ratio(
-                            func.upper(attribute), func.upper(value[0])
-                        ) > (value[1] / 100)
-                    idx += 1
-                    current_idx["value"] = idx
-                    attrs.append((filter_condition, False))
-                else:
-                    same_level = []
-                    for key in keys[i]:
-                        same_level.append(
-                            self.get_attrs(
-                                previous_model, current_idx, key, operators, values
-                            )
-                        )
-                    attrs.append(same_level)
+                same_level = tuple(
+                    self.compile_attrs(previous_model, current_idx, key, operators)
+                    for key in keys[i]
+                )
+                steps.append(("group", same_level))
+        return tuple(steps)
+
+    def get_operator_builder(self, operator: str):
+        if operator.startswith("json."):
+            return partial(json_condition, json_key="$." + operator.split(".")[1])
+        return FILTER_OPERATORS.get(operator, unknown_condition)
 
+    def bind_filter_plan(self, plan: tuple, values: List) -> List:
+        attrs = []
+        for step in plan:
+            if step[0] == "relation":
+                attrs.append((step[1], step[2]))
+            elif step[0] == "filter":
+                _, attribute, is_method, builder, idx = step
+                value = values[idx]
+                if is_method:
+                    attribute = attribute(*value["args"])
+                    value = value["operator_value"]
+                attrs.append((builder(self, attribute, value), False))
+            else:
+                attrs.append([self.bind_filter_plan(sub, values) for sub in step[1]])
         return attrs
 
+    def get_attrs(self, parent_model, current_idx, keys, operators, values):
+        plan = self.compile_attrs(parent_model, current_idx, keys, operators)
+        return self.bind_filter_plan(plan, values)
+
     def get_first_where_array(
             self, db: Session, *, where: Any = None, relations=None
     ) -> List[ModelType]:
@@ -359,11 +706,284 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             order_by_subquery=None,
             today_first: bool = False,
     ) -> List[ModelType]:
-        query = db.query(self.model)
         conditions = self.get_full_condition(
             where=where,
             include_deleted=include_deleted,
         )
+        query = self.get_page_query(
+            db=db,
+            conditions=conditions,
+            skip=skip,
+            limit=limit,
+            order_by=order_by,
+            order=order,
+            base_columns=base_columns,
+            relations=relations,
+            order_by_subquery=order_by_subquery,
+            today_first=today_first,
+        )
+        result = query.all()
+        return result
+
+    def get_page_with_count(
+            self,
+            db: Session,
+            *,
+            skip: int = 0,
+            limit: int = 100,
+            order_by: str = "id",
+            where: Any = None,
+            order: str = "DESC",
+            base_columns=None,
+            relations=None,
+            include_deleted: bool = False,
+            order_by_subquery=None,
+            today_first: bool = False,
+            count_mode: CountMode = "exact",
+    ) -> Tuple[List[ModelType], int]:
+        """
+        Return the requested page and the total number of matching rows.
+
+        The conditions are built once. For an exact count on a dialect
+        supporting window functions the total comes with the page
+        (`COUNT(*) OVER()`), otherwise it is computed by `get_count`.
+        """
+        conditions = self.get_full_condition(
+            where=where,
+            include_deleted=include_deleted,
+        )
+        query = self.get_page_query(
+            db=db,
+            conditions=conditions,
+            skip=skip,
+            limit=limit,
+            order_by=order_by,
+            order=order,
+            base_columns=base_columns,
+            relations=relations,
+            order_by_subquery=order_by_subquery,
+            today_first=today_first,
+        )
+        if count_mode == "exact" and self.supports_window_count(db):
+            rows = query.add_columns(func.count().over().label("total_count")).all()
+            if rows:
+                return [row[0] for row in rows], rows[0][1]
+            if not skip:
+                return [], 0
+
+        data = query.all()
+        count = self.get_count(
+            db=db, conditions=conditions, count_mode=count_mode, filtered=bool(where)
+        )
+        return data, count
+
+    def supports_window_count(self, db: Session) -> bool:
+        dialect = db.connection().dialect
+        name = "mariadb" if getattr(dialect, "is_mariadb", False) else dialect.name
+        min_version = WINDOW_FUNCTION_MIN_VERSIONS.get(name)
+        version = dialect.server_version_info
+        if min_version is None or not version:
+            return False
+        return tuple(version[:2]) >= min_version
+
+    def get_page_by_cursor(
+            self,
+            db: Session,
+            *,
+            cursor: Optional[str] = None,
+            limit: int = 100,
+            order_by: str = "id",
+            where: Any = None,
+            order: str = "DESC",
+            base_columns=None,
+            relations=None,
+            include_deleted: bool = False,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Keyset pagination: seek after the row encoded in `cursor` on
+        `order_by` with `id` as tiebreaker instead of skipping rows, so any
+        page costs the same as the first one.
+
+        Returns the page and the cursor of the next page (None on the last page).
+        """
+        if "." in order_by:
+            raise HTTPException(
+                status_code=400,
+                detail="Cursor pagination only supports columns of the model",
+            )
+        conditions = self.get_full_condition(
+            where=where,
+            include_deleted=include_deleted,
+        )
+        if cursor:
+            seek = self.get_cursor_condition(
+                cursor=cursor, order_by=order_by, order=order
+            )
+            conditions = seek if conditions is None else and_(conditions, seek)
+        query = self.get_page_query(
+            db=db,
+            conditions=conditions,
+            limit=limit,
+            order_by=order_by,
+            order=order,
+            base_columns=base_columns,
+            relations=relations,
+        )
+        result = query.all()
+        return result, self.get_next_cursor(result, limit=limit, order_by=order_by)
+
+    def get_next_cursor(
+            self, rows: List[ModelType], *, limit: int, order_by: str = "id"
+    ) -> Optional[str]:
+        if not rows or len(rows) < limit or "." in order_by:
+            return None
+        last = rows[-1]
+        values = [last.id] if order_by == "id" else [getattr(last, order_by), last.id]
+        return encode_cursor(values)
+
+    def get_cursor_condition(self, *, cursor: str, order_by: str, order: str):
+        values = decode_cursor(cursor)
+        id_column = self.model.id
+        if order_by == "id":
+            if len(values) != 1:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            return id_column < values[0] if order == "DESC" else id_column > values[0]
+
+        if len(values) != 2:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        column = getattr(self.model, order_by)
+        value = parse_cursor_value(column, values[0])
+        last_id = values[1]
+        # ties are always broken on `id DESC`, like `get_page_query`.
+        # NULL sorts first in ascending order (MySQL/SQLite).
+        if value is None:
+            same_value = and_(column.is_(None), id_column < last_id)
+            if order == "DESC":
+                return same_value
+            return or_(same_value, column.isnot(None))
+        after = column < value if order == "DESC" else column > value
+        same_value = and_(column == value, id_column < last_id)
+        if order == "DESC":
+            return or_(after, same_value, column.is_(None))
+        return or_(after, same_value)
+
+    def export(
+            self,
+            db: Session,
+            *,
+            where: Any = None,
+            columns: Optional[Tuple[str, ...]] = None,
+            include_deleted: bool = False,
+            chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> Result:
+        """
+        Rows matching `where` as tuples of `columns` (every column by default),
+        ordered by id and read from a server-side cursor `chunk_size` rows at a
+        time.
+
+        Columns are selected instead of ORM objects, nothing is kept in the
+        session: iterating the result runs in constant memory whatever the
+        number of rows. The conditions are built before returning, so an
+        invalid `where` raises here and not while iterating.
+        """
+        conditions = self.get_full_condition(
+            where=where,
+            include_deleted=include_deleted,
+        )
+        statement = select(*(getattr(self.model, key) for key in columns or self.get_column_keys()))
+        if conditions is not None:
+            statement = statement.where(conditions)
+        statement = statement.order_by(self.model.id).execution_options(
+            stream_results=True, yield_per=chunk_size
+        )
+        return db.execute(statement)
+
+    def aggregate(
+            self,
+            db: Session,
+            *,
+            group_by: Optional[List[str]] = None,
+            metrics: Optional[List[str]] = None,
+            where: Any = None,
+            include_deleted: bool = False,
+            limit: int = MAX_AGGREGATE_GROUPS,
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate the rows matching `where` in the database.
+
+        `group_by` holds columns or dotted relation paths (`category.name`,
+        joined with LEFT OUTER JOINs), `metrics` holds `count` or
+        `<count|sum|avg|min|max>:<column or path>` (`sum:price`). Returns one
+        dict per group keyed by the group paths and the metrics, `:` replaced
+        by `_` (`{"category.name": "food", "count": 2, "sum_price": 7}`).
+        """
+        metrics = metrics or ["count"]
+        joins = {}
+        group_columns = [self.get_path_column(path, joins) for path in group_by or []]
+        metric_columns = []
+        for metric in metrics:
+            name, _, path = metric.partition(":")
+            function = AGGREGATE_FUNCTIONS.get(name)
+            if function is None or (not path and name != "count"):
+                raise HTTPException(status_code=400, detail=f"aggregate: invalid metric {metric}")
+            metric_columns.append(function(self.get_path_column(path, joins)) if path else func.count())
+
+        statement = select(*group_columns, *metric_columns).select_from(self.model)
+        for _, relationship in joins.values():
+            statement = statement.outerjoin(relationship)
+        conditions = self.get_full_condition(
+            where=where,
+            include_deleted=include_deleted,
+        )
+        if conditions is not None:
+            statement = statement.where(conditions)
+        if group_columns:
+            statement = statement.group_by(*group_columns).order_by(*group_columns)
+        statement = statement.limit(limit)
+
+        keys = list(group_by or []) + [metric.replace(":", "_") for metric in metrics]
+        return [dict(zip(keys, row)) for row in db.execute(statement)]
+
+    def get_path_column(self, path: str, joins: Dict[Tuple[str, ...], Any]):
+        """
+        Column of a dotted path (`category.owner.name`), each relation of the
+        path is aliased once and added to `joins` (relation path -> alias and
+        relationship to join).
+        """
+        parts = path.split(".")
+        current_model = self.model
+        for i in range(len(parts) - 1):
+            attr = getattr(current_model, parts[i], None)
+            if not isinstance(getattr(attr, "property", None), RelationshipProperty):
+                raise HTTPException(status_code=400, detail=f"aggregate: invalid path {path}")
+            relation_path = tuple(parts[:i + 1])
+            if relation_path not in joins:
+                target = aliased(attr.property.mapper.class_)
+                joins[relation_path] = (target, attr.of_type(target))
+            current_model = joins[relation_path][0]
+        column = getattr(current_model, parts[-1], None)
+        if (
+            not isinstance(getattr(column, "property", None), ColumnProperty)
+            or parts[-1] in AGGREGATE_EXCLUDED_COLUMNS
+        ):
+            raise HTTPException(status_code=400, detail=f"aggregate: invalid path {path}")
+        return column
+
+    def get_page_query(
+            self,
+            db: Session,
+            *,
+            conditions: Any = None,
+            skip: int = 0,
+            limit: int = 100,
+            order_by: str = "id",
+            order: str = "DESC",
+            base_columns=None,
+            relations=None,
+            order_by_subquery=None,
+            today_first: bool = False,
+    ):
+        query = db.query(self.model)
         if conditions is not None:
             query = query.filter(conditions)
 
@@ -375,13 +995,21 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             query = query.order_by(order_function(order_by_subquery))
         else:
             today = date.today()
-            if len(order_by.split(".")) > 1:
+            tomorrow = today + timedelta(days=1)
+            order_by_attribute = None
+            if "." in order_by or order_by.startswith("@"):
+                joins = {}
+                order_by_attribute = self.get_order_by_column(order_by, joins)
+                for _, relationship in joins.values():
+                    query = query.outerjoin(relationship)
+            if order_by_attribute is None and "." in order_by:
                 if today_first:
                     order_by_subquery = self.get_order_by_subquery(
                         db=db, order_by_key=order_by
                     )
                     query = query.order_by(
-                        case([(func.date(order_by_subquery) == today, 0)], else_=1),
+                        # evaluated once, a range would run the subquery twice
+                        case((func.date(order_by_subquery) == today, 0), else_=1),
                         order_function(order_by_subquery),
                     )
                 else:
@@ -390,15 +1018,14 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                     )
                     query = query.order_by(order_function(order_by_subquery))
             else:
-                if today_first:
+                if order_by_attribute is None:
                     order_by_attribute = getattr(self.model, order_by)
-
+                if today_first:
                     query = query.order_by(
-                        case([(func.date(order_by_attribute) == today, 0)], else_=1),
+                        case((date_range_condition(order_by_attribute, today, tomorrow), 0), else_=1),
                         order_function(order_by_attribute),
                     )
                 else:
-                    order_by_attribute = getattr(self.model, order_by)
                     query = query.order_by(order_function(order_by_attribute))
 
         query = (
@@ -409,52 +1036,89 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             .limit(limit)
         )
         if base_columns is not None and len(base_columns) > 0:
-            query = query.options(load_only(*base_columns))
+            query = query.options(self.get_load_only(base_columns))
 
         if relations is not None and len(relations) > 0:
             load_options = self.get_joined_load(relations)
             query = query.options(*load_options)
 
-        result = query.all()
-        return result
+        return query
 
-    def get_order_by_subquery(self, db: Session, *, order_by_key):
-        key_segments = order_by_key.split(".")
-        subquery_filter = True
-        attribute = getattr(self.model, key_segments[0])
-        joins = []
-        last_attribut = self.model
-        first_attribut = attribute.property.mapper.class_
-        if len(key_segments) > 1:
-            for segment in key_segments[1:]:
-                last_attribut = attribute.property.mapper.class_
-
-                if segment.startswith("@"):
-                    pattern = r"@(\w+)(\(.*\))"
-                    match = re.search(pattern, segment)
-                    method_name = match.group(1)
-                    argument = match.group(2)
-                    attribute = eval("method" + argument)
-                else:
-                    attribute = getattr(attribute.property.mapper.class_, segment)
-
-                if segment != key_segments[-1]:
-                    joins.insert(0, attribute)
+    def get_load_only(self, base_columns):
+        """`load_only` option for column names or attributes of the model."""
+        return load_only(*(
+            getattr(self.model, column) if isinstance(column, str) else column
+            for column in base_columns
+        ))
 
-        model_mapper = inspect(first_attribut)
-
-        for relationship in model_mapper.relationships:
+    def get_order_by_column(self, order_by: str, joins: Dict[Tuple[str, ...], Any]):
+        """
+        Expression to sort on for a dotted `order_by` crossing only many-to-one
+        relations (`category.owner.name`). Each relation is aliased and added
+        to `joins` (relation path -> alias and relationship to join) to be
+        LEFT OUTER JOINed on the page query, so the sort can use the indexes
+        of the joined tables.
+
+        Returns None, leaving `joins` untouched, when the path crosses a
+        to-many relation: it is sorted by `get_order_by_subquery`.
+        """
+        parts = split_order_by(order_by)
+        current_model = self.model
+        path_joins = {}
+        for i in range(len(parts) - 1):
+            attr = getattr(current_model, parts[i], None)
+            relationship = getattr(attr, "property", None)
+            if not isinstance(relationship, RelationshipProperty):
+                raise HTTPException(status_code=400, detail=f"order_by: invalid path {order_by}")
+            if relationship.uselist:
+                return None
+            target = aliased(relationship.mapper.class_)
+            path_joins[tuple(parts[:i + 1])] = (target, attr.of_type(target))
+            current_model = target
+        column = self.get_order_by_part(current_model, parts[-1], order_by)
+        joins.update(path_joins)
+        return column
+
+    def get_order_by_part(self, model, part: str, order_by: str):
+        """Column `part` of `model`, or the expression of a registered `@method(...)`."""
+        if part.startswith("@"):
+            function, arguments = parse_order_by_method(part)
+            return function(model, *arguments)
+        column = getattr(model, part, None)
+        if not isinstance(getattr(column, "property", None), ColumnProperty):
+            raise HTTPException(status_code=400, detail=f"order_by: invalid path {order_by}")
+        return column
 
-            if relationship.mapper.class_ == self.model:
-                foreign_key_column = list(relationship.local_columns)[0]
-                subquery_filter = foreign_key_column == self.model.id
-                break
+    def get_order_by_subquery(self, db: Session, *, order_by_key):
+        """
+        Correlated scalar subquery returning the value of a dotted `order_by`
+        crossing a to-many relation (`products.name`) for the first related row.
+        """
+        key_segments = split_order_by(order_by_key)
+        attribute = getattr(self.model, key_segments[0], None)
+        first_relationship = getattr(attribute, "property", None)
+        if not isinstance(first_relationship, RelationshipProperty):
+            raise HTTPException(status_code=400, detail=f"order_by: invalid path {order_by_key}")
+        first_model = first_relationship.mapper.class_
+        joins = []
+        for i, segment in enumerate(key_segments[1:], start=1):
+            relationship = getattr(attribute, "property", None)
+            if not isinstance(relationship, RelationshipProperty):
+                raise HTTPException(status_code=400, detail=f"order_by: invalid path {order_by_key}")
+            last_model = relationship.mapper.class_
+            if i < len(key_segments) - 1:
+                attribute = getattr(last_model, segment, None)
+                joins.append(attribute)
+            else:
+                attribute = self.get_order_by_part(last_model, segment, order_by_key)
 
-        subquery_query = db.query(attribute).select_from(last_attribut)
+        subquery_filter = first_relationship.primaryjoin
+        if first_relationship.secondary is not None:
+            subquery_filter = and_(subquery_filter, first_relationship.secondaryjoin)
+        subquery_query = select(attribute).select_from(first_model)
         for relation in joins:
             subquery_query = subquery_query.join(relation)
-        subquery = subquery_query.filter(subquery_filter).limit(1).as_scalar()
-        return subquery
+        return subquery_query.where(subquery_filter).limit(1).scalar_subquery()
 
     def create(
             self,
@@ -476,10 +1140,12 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         )
 
         db.add(db_obj)
+        self.sync_trigrams(db, objs=[db_obj])
         if commit:
             db.commit()
         if refresh:
             db.refresh(db_obj)
+        self.after_write(db, ids=[])
         return db_obj
 
     def create_multi(
@@ -492,7 +1158,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     ) -> List[ModelType]:
         objs_to_add = []
         for obj_in in objs_in:
-            obj_in_data = jsonable_encoder(obj_in)
+            obj_in_data = obj_in.model_dump()
             db_obj = (
                 self.model(**obj_in_data)
                 if not user_id
@@ -500,10 +1166,64 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             )  # type: ignore
             objs_to_add.append(db_obj)
         db.add_all(objs_to_add)
+        self.sync_trigrams(db, objs=objs_to_add)
         if commit:
             db.commit()
+        self.after_write(db, ids=[])
         return objs_to_add
 
+    def bulk_create(
+            self,
+            db: Session,
+            *,
+            objs_in: List[Union[CreateSchemaType, Dict[str, Any]]],
+            user_id: int = None,
+            batch_size: int = BULK_INSERT_BATCH_SIZE,
+            return_ids: bool = False,
+            commit: bool = True,
+    ) -> Tuple[int, List[Any]]:
+        """
+        Insert `objs_in` without building ORM objects, `batch_size` rows per
+        executemany INSERT. Returns the number of inserted rows and, with
+        `return_ids`, their ids.
+
+        Ids are read with RETURNING where the database supports it, otherwise
+        each row is inserted on its own to read its lastrowid. Models with
+        `__trigram_columns__` always need the ids.
+        """
+        table = self.model.__table__
+        dialect = db.get_bind().dialect
+        need_ids = return_ids or bool(self.get_trigram_columns())
+        use_returning = need_ids and dialect.insert_executemany_returning
+        statement = insert(table).returning(table.c.id) if use_returning else insert(table)
+        count = 0
+        ids = []
+        for start in range(0, len(objs_in), batch_size):
+            rows = [self.get_insert_row(obj_in) for obj_in in objs_in[start:start + batch_size]]
+            if user_id:
+                for row in rows:
+                    row["last_user_to_interact"] = user_id
+            if use_returning:
+                batch_ids = db.execute(statement, rows).scalars().all()
+            elif need_ids:
+                batch_ids = [db.execute(statement, row).inserted_primary_key[0] for row in rows]
+            else:
+                db.execute(statement, rows)
+                batch_ids = []
+            self.sync_trigrams(db, ids=batch_ids)
+            ids.extend(batch_ids)
+            count += len(rows)
+        if commit:
+            db.commit()
+        self.after_write(db, ids=[])
+        return count, ids if return_ids else []
+
+    def get_insert_row(self, obj_in: Union[CreateSchemaType, Dict[str, Any]]) -> Dict[str, Any]:
+        """Column values inserted by `bulk_create` for `obj_in`."""
+        if isinstance(obj_in, dict):
+            return dict(obj_in)
+        return obj_in.model_dump()
+
     def add_model(
             self,
             db: Session,
@@ -515,9 +1235,11 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         if user_id:
             db_obj.last_user_to_interact = user_id
         db.add(db_obj)
+        self.sync_trigrams(db, objs=[db_obj])
         if commit:
             db.commit()
             db.refresh(db_obj)
+        self.after_write(db, ids=[db_obj.id] if db_obj.id is not None else [])
         return db_obj
 
     def update(
@@ -529,32 +1251,197 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         user_id: int = None,
         commit: bool = True,
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
+        update_data = self.get_update_values(obj_in)
+
+        for field, value in update_data.items():
+            setattr(db_obj, field, value)
+
+        db.add(db_obj)
+        self.sync_trigrams(db, objs=[db_obj], changed=update_data)
+        if commit:
+            db.commit()
+            db.refresh(db_obj)
+        self.after_write(db, ids=[db_obj.id])
+        return db_obj
+
+    def update_by_id(
+        self,
+        db: Session,
+        *,
+        id: Any,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        user_id: int = None,
+        commit: bool = True,
+    ) -> Optional[ModelType]:
+        """
+        Update the row `id` with a single `UPDATE ... WHERE id = :id`, without
+        loading it first. Returns None when no row has this id.
+
+        The updated row is read back with RETURNING where the database supports
+        it (a detached copy, relationships are not loaded), otherwise with a
+        SELECT after the commit.
+        """
+        values = self.get_update_values(obj_in)
+        if user_id and "last_user_to_interact" in self.get_column_keys():
+            values["last_user_to_interact"] = user_id
+        return self.update_row(db, id=id, values=values, commit=commit)
 
-        # 🔁 Pydantic v2 compliant way to extract data
+    def update_row(
+        self,
+        db: Session,
+        *,
+        id: Any,
+        values: Dict[str, Any],
+        commit: bool = True,
+        returning: bool = True,
+    ) -> Optional[ModelType]:
+        """
+        Set column `values` on the row `id` with one UPDATE, see `update_by_id`.
+
+        With `returning=False` the row is always read back with `Session.get`,
+        returning the instance of the session instead of a detached copy.
+        """
+        statement = (
+            update(self.model)
+            .where(self.model.id == id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        column_keys = self.get_column_keys()
+        use_returning = returning and db.get_bind().dialect.update_returning
+        if use_returning:
+            statement = statement.returning(*(getattr(self.model, key) for key in column_keys))
+        result = db.execute(statement)
+        row = result.first() if use_returning else None
+        self.sync_trigrams(db, ids=[id], changed=values)
+        if commit:
+            db.commit()
+        if (use_returning and row is None) or (not use_returning and result.rowcount == 0):
+            return None
+        self.after_write(db, ids=[id])
+        if use_returning:
+            return self.model(**dict(zip(column_keys, row)))
+        return db.get(self.model, id, populate_existing=True)
+
+    def get_update_values(self, obj_in: Union[UpdateSchemaType, Dict[str, Any]]) -> Dict[str, Any]:
+        """Values of `obj_in` matching a column, plus `updated_at` when the model has it."""
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.model_dump(exclude_unset=True)
+        column_keys = self.get_column_keys()
+        values = {key: value for key, value in update_data.items() if key in column_keys}
+        if "updated_at" in column_keys:
+            values["updated_at"] = func.now()
+        return values
+
+    def get_column_keys(self) -> Tuple[str, ...]:
+        """Attribute names of the mapped columns of the model."""
+        if self._column_keys is None:
+            self._column_keys = tuple(column.key for column in inspect(self.model).column_attrs)
+        return self._column_keys
+
+    def get_trigram_columns(self) -> Tuple[str, ...]:
+        """Columns indexed in `app.db.trigram` for the `ratio` operator."""
+        return tuple(getattr(self.model, "__trigram_columns__", ()))
+
+    def sync_trigrams(
+            self,
+            db: Session,
+            *,
+            ids: Optional[List[Any]] = None,
+            objs: Optional[List[ModelType]] = None,
+            changed: Optional[Iterable[str]] = None,
+    ) -> None:
+        """
+        Rewrite the trigrams of the rows `ids` (or of the ORM objects `objs`,
+        flushed first) from their current values, in the caller's transaction.
+        Rows that no longer exist lose their trigrams.
 
-        update_data["updated_at"] = func.now()
+        Does nothing for models without `__trigram_columns__`, or when none of
+        the `changed` columns is one of them.
+        """
+        columns = self.get_trigram_columns()
+        if not columns or (changed is not None and not set(changed) & set(columns)):
+            return
+        db.flush()
+        if objs is not None:
+            ids = [obj.id for obj in objs]
+        if not ids:
+            return
+        table_name = self.model.__tablename__
+        db.execute(delete(Trigram).where(Trigram.table_name == table_name, Trigram.row_id.in_(ids)))
+        rows = db.execute(
+            select(self.model.id, *(getattr(self.model, column) for column in columns))
+            .where(self.model.id.in_(ids))
+        )
+        grams = [
+            {"table_name": table_name, "column_name": column, "gram": gram, "row_id": row[0]}
+            for row in rows
+            for column, value in zip(columns, row[1:])
+            for gram in trigrams(value)
+        ]
+        if grams:
+            db.execute(insert(Trigram), grams)
+
+    def delete_trigrams_where(self, db: Session, ids_query: Any) -> None:
+        """
+        Delete the trigrams of the rows whose id is selected by `ids_query`,
+        before these rows are deleted by condition.
+        """
+        if not self.get_trigram_columns():
+            return
+        db.execute(
+            delete(Trigram)
+            .where(Trigram.table_name == self.model.__tablename__, Trigram.row_id.in_(ids_query))
+            .execution_options(synchronize_session=False)
+        )
 
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+    def rebuild_trigrams(self, db: Session, *, chunk_size: int = TRIGRAM_REBUILD_CHUNK_SIZE) -> int:
+        """
+        Rewrite the trigrams of every row, `chunk_size` rows per transaction.
 
-        db.add(db_obj)
-        if commit:
+        Rows written before the model had `__trigram_columns__` or outside
+        `CRUDBase` (raw SQL, imports) have no trigrams and would be missed by
+        the `ratio` operator until then, see `rebuild_trigrams.py`. Returns
+        the number of rows indexed.
+        """
+        if not self.get_trigram_columns():
+            return 0
+        db.execute(delete(Trigram).where(Trigram.table_name == self.model.__tablename__))
+        db.commit()
+        indexed = 0
+        last_id = None
+        while True:
+            statement = select(self.model.id).order_by(self.model.id).limit(chunk_size)
+            if last_id is not None:
+                statement = statement.where(self.model.id > last_id)
+            ids = list(db.scalars(statement))
+            if not ids:
+                return indexed
+            self.sync_trigrams(db, ids=ids)
             db.commit()
-            db.refresh(db_obj)
-        return db_obj
+            indexed += len(ids)
+            last_id = ids[-1]
+
+    def has_missing_trigrams(self, db: Session) -> bool:
+        """Whether the table has rows but no trigrams yet (e.g. `__trigram_columns__` was just added)."""
+        if not self.get_trigram_columns():
+            return False
+        has_rows = db.execute(select(self.model.id).limit(1)).first() is not None
+        has_trigrams = db.execute(
+            select(Trigram.row_id).where(Trigram.table_name == self.model.__tablename__).limit(1)
+        ).first() is not None
+        return has_rows and not has_trigrams
 
 
     def remove(self, db: Session, *, id: int, commit: bool = True) -> ModelType:
         obj = db.get(self.model, id)
         db.delete(obj)
+        self.sync_trigrams(db, ids=[id])
         if commit:
             db.commit()
+        self.after_write(db, ids=[id])
         return obj
 
 
@@ -595,85 +1482,219 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             db.commit()
 
     def bulk_remove(
-            self, db: Session, *, ids_to_delete: str, commit: bool = True, keys: str = "id"
-    ) -> ModelType:
-        ids_to_select = [int(x) for x in ast.literal_eval(ids_to_delete)]
-        query = (
-            db.query(getattr(self.model, keys))
-            .filter(getattr(self.model, keys).in_(ids_to_select))
-            .all()
-        )
-        ids_found = [result[0] for result in query]
-        # to delete only the IDs that exist in the database
-        query = delete(self.model).where(getattr(self.model, keys).in_(ids_found))
-        db.execute(query)
-        if commit:
-            db.commit()
+            self,
+            db: Session,
+            *,
+            ids_to_delete: Union[str, bytes, Iterable],
+            commit: bool = True,
+            keys: str = "id",
+            chunk_size: int = BULK_DELETE_CHUNK_SIZE,
+            progress: Optional[Callable[[int], None]] = None,
+    ) -> List[int]:
+        """
+        Delete the rows whose `keys` column is in `ids_to_delete` (see
+        `iter_ids`), `chunk_size` ids per DELETE and, with `commit`, per
+        transaction. Ids without a row are ignored by the DELETE itself.
+
+        The ids are read chunk by chunk, so a stream is never fully loaded.
+        `progress` is called with the number of rows deleted so far after each
+        chunk. Returns the number of deleted rows of each chunk.
+        """
+        if chunk_size < 1:
+            raise ValueError(f"Invalid chunk size {chunk_size}")
+        column = getattr(self.model, keys)
+        try:
+            cast = column.type.python_type
+        except NotImplementedError:
+            cast = None
+        ids = iter_ids(ids_to_delete, cast=cast)
+        deleted = []
+        while True:
+            chunk = list(islice(ids, chunk_size))
+            if not chunk:
+                return deleted
+            if keys != "id":
+                self.delete_trigrams_where(db, select(self.model.id).where(column.in_(chunk)))
+            result = db.execute(
+                delete(self.model)
+                .where(column.in_(chunk))
+                .execution_options(synchronize_session=False)
+            )
+            if keys == "id":
+                self.sync_trigrams(db, ids=chunk)
+            if commit:
+                db.commit()
+            self.after_write(db, ids=chunk if keys == "id" else None)
+            deleted.append(result.rowcount)
+            if progress:
+                progress(sum(deleted))
 
     def soft_delete(
             self, db: Session, *, id: int, commit: bool = True, user_id: int = None
-    ) -> ModelType:
-        db_obj = db.query(self.model).get(id)
-        obj_data = jsonable_encoder(db_obj)
-        update_data = {"deleted_at": func.now()}
-
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        db.add(db_obj)
-        if commit:
-            db.commit()
-            db.refresh(db_obj)
-        return db_obj
+    ) -> Optional[ModelType]:
+        """Set `deleted_at` on the row `id`, returns its instance or None when missing."""
+        return self.update_row(
+            db, id=id, values={"deleted_at": func.now()}, commit=commit, returning=False
+        )
 
     def restore_deleted(
             self, db: Session, *, id: int, commit: bool = True, user_id: int = None
-    ) -> ModelType:
-        db_obj = db.query(self.model).get(id)
-        obj_data = jsonable_encoder(db_obj)
-        update_data = (
-            {
-                "deleted_at": None,
-                "last_user_to_interact": user_id,
-            }
-            if user_id
-            else {"deleted_at": None}
-        )
+    ) -> Optional[ModelType]:
+        """Clear `deleted_at` on the row `id`, returns its instance or None when missing."""
+        values = {"deleted_at": None}
+        if user_id and "last_user_to_interact" in self.get_column_keys():
+            values["last_user_to_interact"] = user_id
+        return self.update_row(db, id=id, values=values, commit=commit, returning=False)
 
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        db.add(db_obj)
-        if commit:
+    def soft_delete_where(
+            self,
+            db: Session,
+            *,
+            where: Any,
+            user_id: int = None,
+            chunk_size: int = SOFT_DELETE_CHUNK_SIZE,
+            progress: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """
+        Soft delete the rows matching `where` (same syntax as
+        `get_multi_where_array`), `chunk_size` rows per UPDATE and transaction.
+
+        `progress` is called with the number of rows deleted so far after each
+        chunk. Returns the number of deleted rows.
+        """
+        values = {"deleted_at": func.now()}
+        if user_id and "last_user_to_interact" in self.get_column_keys():
+            values["last_user_to_interact"] = user_id
+        conditions = self.get_full_condition(where=where)
+        deleted = 0
+        last_id = None
+        while True:
+            # MySQL does not allow LIMIT in an `IN (subquery)`, so the ids are selected first
+            query = db.query(self.model.id).filter(conditions)
+            if last_id is not None:
+                query = query.filter(self.model.id > last_id)
+            ids = [row[0] for row in query.order_by(self.model.id).limit(chunk_size)]
+            if not ids:
+                return deleted
+            db.execute(
+                update(self.model)
+                .where(self.model.id.in_(ids))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
             db.commit()
-            db.refresh(db_obj)
-        return db_obj
+            self.after_write(db, ids=ids)
+            deleted += len(ids)
+            last_id = ids[-1]
+            if progress:
+                progress(deleted)
+
+    def after_write(self, db: Session, *, ids: Optional[List[Any]] = None) -> None:
+        """
+        Called after every write made through this CRUD object.
+
+        `ids` are the existing rows that were modified or deleted (`[]` for
+        inserts only, None when unknown, e.g. a delete by condition).
+        Bumps the version of the table, invalidating the cached responses
+        that read it (the tables written in a transaction are bumped again
+        on commit, see `bump_written_tables`). Override it to invalidate
+        other caches, calling `super().after_write`.
+        """
+        cache.table_versions.bump(self.model.__tablename__)
 
     def get_count_where_array(
             self,
             db: Session,
             where: Any = None,
             include_deleted=False,
+            count_mode: CountMode = "exact",
     ) -> int:
-        query = db.query(self.model.id)
-
         conditions = self.get_full_condition(
             where=where,
             include_deleted=include_deleted,
         )
+        return self.get_count(
+            db=db, conditions=conditions, count_mode=count_mode, filtered=bool(where)
+        )
+
+    def get_count(
+            self,
+            db: Session,
+            *,
+            conditions: Any = None,
+            count_mode: CountMode = "exact",
+            filtered: bool = True,
+    ) -> int:
+        """
+        Count the rows matching `conditions` with the given strategy:
+
+        * `exact`: `COUNT` on every call
+        * `cached`: exact count kept `COUNT_CACHE_TTL` seconds, keyed by the compiled query
+        * `estimated`: table statistics when there is no user filter, exact otherwise
+        """
+        if count_mode not in COUNT_MODES:
+            raise ValueError(f"Invalid count mode {count_mode}")
+        query = self.get_count_query(db=db, conditions=conditions)
+
+        if count_mode == "estimated" and not filtered:
+            estimate = self.get_estimated_count(db)
+            if estimate is not None:
+                return estimate
+
+        if count_mode == "cached":
+            compiled = query.statement.compile(dialect=db.get_bind().dialect)
+            key = (str(compiled), json.dumps(compiled.params, sort_keys=True, default=str))
+            result = count_cache.get(key)
+            if result is None:
+                result = query.count()
+                count_cache.set(key, result)
+            return result
+
+        # print("count ito ah",str(query.statement.compile(compile_kwargs={"literal_binds": True})))
+        return query.count()
+
+    def get_estimated_count(self, db: Session) -> Optional[int]:
+        """
+        Row estimate from the MySQL/MariaDB table statistics, None when not
+        available. Soft deleted rows are in the statistics, so there is no
+        estimate for models with a `deleted_at` column.
+        """
+        if "deleted_at" in self.get_column_keys():
+            return None
+        if db.connection().dialect.name not in ("mysql", "mariadb"):
+            return None
+        row = db.execute(
+            text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"
+            ),
+            {"table_name": self.model.__tablename__},
+        ).first()
+        if row is None or row[0] is None:
+            return None
+        return int(row[0])
+
+    def get_count_query(self, db: Session, *, conditions: Any = None):
+        query = db.query(self.model.id)
         if conditions is not None:
             query = query.filter(conditions)
+        return query
 
-        # print("count ito ah",str(query.statement.compile(compile_kwargs={"literal_binds": True})))
-        result = query.count()
-        return result
+    def get_version(self) -> Tuple[str, int]:
+        """
+        Version of the table of the model in `cache.table_versions`, bumped by
+        every write committed through a session (see `after_write`), used for
+        the ETags of the generated routes. Unlike `updated_at` it changes on
+        every write, even within the same second, and costs no query.
+        """
+        return cache.table_versions.epoch, cache.table_versions.get(self.model.__tablename__)
 
     def get_full_condition(
             self, where: Any = None, include_deleted=False
     ) -> Any:
         if not include_deleted:
-            if not where:
-                where = []
+            # copy so that the caller's list can be reused for another query
+            where = list(where) if where else []
             where.append(
                 {
                     "key": "deleted_at",
@@ -709,35 +1730,32 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def remove_where_array(
             self, db: Session, where: Any = None, commit: bool = True
     ) -> int:
+        """
+        Delete the rows matching `where` (same syntax as `get_multi_where_array`,
+        soft deleted rows included), returns the number of deleted rows.
+        """
         query = db.query(self.model)
-        if where is not None:
-            conditions = []
-            for condition in where:
-                filter_condition = self.get_condition_deep_multiple(
-                    db=db, condition=condition
-                )
-                if filter_condition is not None:
-                    conditions.append(filter_condition)
-
-            query = query.filter(and_(*conditions))
-        query.delete()
+        conditions = self.get_full_condition(where=where, include_deleted=True)
+        if conditions is not None:
+            query = query.filter(conditions)
+        self.delete_trigrams_where(db, query.with_entities(self.model.id).statement)
+        deleted = query.delete()
         if commit:
             db.commit()
+        self.after_write(db, ids=None)
+        return deleted
 
     def get_date_filter_by_range(self, date_column, date_list):
+        """Match any of the years (`2024`) or months (`2024-05`) of `date_list`."""
         filters = []
         for date_value in date_list:
             parts = date_value.split("-")
             if len(parts) == 1:
                 year = int(parts[0])
-                filters.append(extract("year", date_column) == year)
-            elif len(parts) == 2:
-                year = int(parts[0])
-                month = int(parts[1])
                 filters.append(
-                    and_(
-                        extract("year", date_column) == year,
-                        extract("month", date_column) == month,
-                    )
+                    date_range_condition(date_column, date(year, 1, 1), date(year + 1, 1, 1))
                 )
+            elif len(parts) == 2:
+                start = date(int(parts[0]), int(parts[1]), 1)
+                filters.append(date_range_condition(date_column, start, next_month(start)))
         return or_(*filters)
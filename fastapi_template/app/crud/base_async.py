@@ -0,0 +1,30 @@
+from typing import Any, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class AsyncCRUD:
+    def __init__(self, crud: Any):
+        """
+        Async access to a CRUD object for routes using an `AsyncSession`.
+
+        Every method of the wrapped CRUD object becomes a coroutine taking the
+        `AsyncSession` as `db`. The sync implementation runs inside
+        `AsyncSession.run_sync`, so the queries go through the async driver
+        while the filter DSL and relation loading stay the ones of `CRUDBase`.
+
+        **Parameters**
+
+        * `crud`: A CRUD object (e.g. `crud.user`)
+        """
+        self.crud = crud
+
+    def __getattr__(self, name: str) -> Callable:
+        method = getattr(self.crud, name)
+        if not callable(method):
+            return method
+
+        async def run_method(db: AsyncSession, *args, **kwargs):
+            return await db.run_sync(lambda session: method(session, *args, **kwargs))
+
+        return run_method
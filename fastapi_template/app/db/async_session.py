@@ -0,0 +1,41 @@
+from fastapi import Request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.db.replica import ReplicaRouter, parse_replica_uris, reads_primary
+
+ASYNC_ENGINE_OPTIONS = dict(
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20,
+    pool_timeout=30,
+    pool_recycle=3600,
+)
+
+# Used by the generated routers when the project is generated with `use_async_db`
+async_engine = create_async_engine(settings.ASYNC_SQLALCHEMY_DATABASE_URI, **ASYNC_ENGINE_OPTIONS)
+# objects are read after commit while serializing the response, keep them loaded
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False,
+                                       expire_on_commit=False)
+
+# replica URLs are shared with the sync engines, only the driver changes
+async_replica_router = ReplicaRouter(
+    [
+        create_async_engine(make_url(uri).set(drivername="mysql+aiomysql"), **ASYNC_ENGINE_OPTIONS)
+        for uri in (parse_replica_uris(settings.REPLICA_DATABASE_URIS) if settings.USE_READ_REPLICAS else [])
+    ],
+    settings.REPLICA_ROUTING,
+)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    """`get_async_db` for the read only routes, see `session.read_session`."""
+    replica = None if reads_primary(request) else async_replica_router.pick()
+    async with (AsyncSessionLocal(bind=replica) if replica is not None else AsyncSessionLocal()) as db:
+        yield db
@@ -1,3 +1,4 @@
 # Import all the models, so that Base has them before being
 # imported by Alembic
 from app.db.base_class import Base # noqa
+from app.db.trigram import Trigram # noqa
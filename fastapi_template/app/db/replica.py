@@ -0,0 +1,96 @@
+import hashlib
+import itertools
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+from fastapi import Request, Response
+
+from app.core import cache
+
+# engine picked by `ReplicaRouter.pick`
+REPLICA_ROUTING_STRATEGIES = ("round_robin", "least_connections")
+
+# cookie holding the time until which a client that wrote reads from the primary
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+# methods that don't mark the client as having written
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def parse_replica_uris(value: Optional[str]) -> List[str]:
+    """Replica URLs of the comma-separated `REPLICA_DATABASE_URIS` setting."""
+    return [uri.strip() for uri in (value or "").split(",") if uri.strip()]
+
+
+class ReplicaRouter:
+    """
+    Pick the engine of a read only session among the replica engines,
+    `round_robin` or the one with the fewest checked out connections
+    (`least_connections`).
+    """
+
+    def __init__(self, engines: Sequence[Any], strategy: str = "round_robin"):
+        if strategy not in REPLICA_ROUTING_STRATEGIES:
+            raise ValueError(f"Unknown replica routing strategy {strategy}")
+        self.engines = list(engines)
+        self.strategy = strategy
+        self._turn = itertools.count()
+
+    def pick(self) -> Optional[Any]:
+        """Engine of the next read, None without replicas."""
+        if not self.engines:
+            return None
+        if self.strategy == "least_connections":
+            return min(self.engines, key=lambda engine: engine.pool.checkedout())
+        return self.engines[next(self._turn) % len(self.engines)]
+
+
+def credentials_key(request: Request) -> Optional[str]:
+    """Key of the client in `cache.recent_writes`: sha256 of its Authorization header."""
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()
+
+
+def reads_primary(request: Optional[Request]) -> bool:
+    """
+    Whether the client of `request` wrote recently and must read its writes
+    from the primary: it sent the same Authorization header as a write, or
+    the cookie set on the write response (clients without credentials).
+    """
+    if request is None:
+        return False
+    key = credentials_key(request)
+    if key is not None and cache.recent_writes.get(key):
+        return True
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def mark_write(request: Request, response: Response, seconds: int) -> None:
+    """Send the reads of the client of `request` to the primary for `seconds`."""
+    key = credentials_key(request)
+    if key is not None:
+        cache.recent_writes.set(key, True, ttl=seconds)
+    response.set_cookie(
+        READ_PRIMARY_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True, samesite="lax"
+    )
+
+
+def read_your_writes(seconds: int) -> Callable[[Request, Callable], Awaitable[Response]]:
+    """
+    HTTP middleware marking the clients of successful writes (any method but
+    GET, HEAD and OPTIONS), so that the replicas lag is never seen by the
+    client that wrote.
+    """
+
+    async def middleware(request: Request, call_next: Callable) -> Response:
+        response = await call_next(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            mark_write(request, response, seconds)
+        return response
+
+    return middleware
@@ -1,11 +1,37 @@
+from typing import Optional
+
+from fastapi import Request
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
+from app.db.replica import ReplicaRouter, parse_replica_uris, reads_primary
 
+ENGINE_OPTIONS = dict(
+    pool_pre_ping=True,
+    pool_size=10,  # Increase the pool size
+    max_overflow=20,  # Allow more overflow connections
+    pool_timeout=30,  # Increase the timeout duration
+    pool_recycle=3600,
+)
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True, pool_size=10,  # Increase the pool size
-                       max_overflow=20,  # Allow more overflow connections
-                       pool_timeout=30,  # Increase the timeout duration
-                       pool_recycle=3600)
+engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, **ENGINE_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Read only routes use these engines when the project is generated with `use_read_replicas`
+replica_router = ReplicaRouter(
+    [
+        create_engine(uri, **ENGINE_OPTIONS)
+        for uri in (parse_replica_uris(settings.REPLICA_DATABASE_URIS) if settings.USE_READ_REPLICAS else [])
+    ],
+    settings.REPLICA_ROUTING,
+)
+
+
+def read_session(request: Optional[Request] = None) -> Session:
+    """
+    Session bound to a replica, or to the primary without replicas and for
+    a client that wrote within `READ_YOUR_WRITES_SECONDS`.
+    """
+    replica = None if reads_primary(request) else replica_router.pick()
+    return SessionLocal(bind=replica) if replica is not None else SessionLocal()
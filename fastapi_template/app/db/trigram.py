@@ -0,0 +1,39 @@
+from typing import Optional, Set
+
+from sqlalchemy import Column, Index, Integer, String
+from sqlalchemy.dialects import mysql
+
+from app.db.base_class import Base
+
+
+class Trigram(Base):
+    """
+    Trigrams of the columns listed in the `__trigram_columns__` of a model,
+    kept up to date by `CRUDBase`. The `ratio` operator reads it to select
+    the candidate rows before calling `levenshtein_ratio`.
+    """
+    __tablename__ = "trigram"
+
+    table_name = Column(String(64), primary_key=True)
+    column_name = Column(String(64), primary_key=True)
+    # binary collation: accent/case insensitive ones would merge distinct trigrams
+    gram = Column(
+        String(3).with_variant(mysql.VARCHAR(3, charset="utf8mb4", collation="utf8mb4_bin"), "mysql", "mariadb"),
+        primary_key=True,
+    )
+    row_id = Column(Integer, primary_key=True, autoincrement=False)
+
+    __table_args__ = (
+        Index("ix_trigram_row", "table_name", "row_id"),
+    )
+
+
+def trigrams(value: Optional[str]) -> Set[str]:
+    """
+    Distinct trigrams of `value` upper-cased (like the `ratio` operator),
+    padded with two spaces before and one after (`"AB"` -> `"  A", " AB", "AB "`).
+    """
+    if not value:
+        return set()
+    padded = f"  {value.upper()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
@@ -0,0 +1,9 @@
+from typing import Any, List
+
+from pydantic import BaseModel
+
+
+class BulkResult(BaseModel):
+    count: int
+    ids: List[Any] = []
+    chunks: List[int] = []
@@ -0,0 +1,97 @@
+"""
+Compare the relation loading strategies of `CRUDBase.get_joined_load` on a
+nested include (`items.product.tags`) with `offset`/`limit`.
+
+    python benchmark_relation_loading.py [orders] [items_per_order] [tags_per_product]
+"""
+import sys
+import time
+
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine, event
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+
+from app.crud.base import CRUDBase
+
+BenchBase = declarative_base()
+
+
+class BenchOrder(BenchBase):
+    __tablename__ = "bench_order"
+    id = Column(Integer, primary_key=True)
+    items = relationship("BenchItem")
+
+
+class BenchItem(BenchBase):
+    __tablename__ = "bench_item"
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("bench_order.id"), index=True)
+    product_id = Column(Integer, ForeignKey("bench_product.id"))
+    product = relationship("BenchProduct")
+
+
+class BenchProduct(BenchBase):
+    __tablename__ = "bench_product"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+    tags = relationship("BenchTag")
+
+
+class BenchTag(BenchBase):
+    __tablename__ = "bench_tag"
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("bench_product.id"), index=True)
+
+
+# relation paths passed to `get_multi_where_array` for each strategy
+STRATEGIES = {
+    "auto": ["items.product.tags"],
+    "joined": ["items:joined.product:joined.tags:joined"],
+    "select": ["items:select.product:select.tags:select"],
+}
+
+
+def seed(session, orders: int, items_per_order: int, tags_per_product: int) -> None:
+    products = orders
+    session.execute(BenchProduct.__table__.insert(), [{"id": i, "name": f"p{i}"} for i in range(products)])
+    session.execute(BenchTag.__table__.insert(), [
+        {"product_id": i} for i in range(products) for _ in range(tags_per_product)
+    ])
+    session.execute(BenchOrder.__table__.insert(), [{"id": i} for i in range(orders)])
+    session.execute(BenchItem.__table__.insert(), [
+        {"order_id": i, "product_id": (i + j) % products}
+        for i in range(orders) for j in range(items_per_order)
+    ])
+    session.commit()
+
+
+def run(orders: int = 2000, items_per_order: int = 10, tags_per_product: int = 5, repeat: int = 5) -> None:
+    engine = create_engine("sqlite://")
+    BenchBase.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    seed(session, orders, items_per_order, tags_per_product)
+    crud_order = CRUDBase(BenchOrder)
+
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    print(f"{orders} orders, {items_per_order} items per order, {tags_per_product} tags per product")
+    print(f"{'strategy':<10}{'ms/page':>10}{'queries':>10}")
+    for name, relations in STRATEGIES.items():
+        timings = []
+        for _ in range(repeat):
+            statements.clear()
+            session.expunge_all()
+            start = time.perf_counter()
+            crud_order.get_multi_where_array(
+                db=session, skip=orders // 2, limit=100, relations=relations, include_deleted=True
+            )
+            timings.append(time.perf_counter() - start)
+        print(f"{name:<10}{min(timings) * 1000:>10.1f}{len(statements):>10}")
+    session.close()
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:4]))
@@ -3,7 +3,9 @@ from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.api_v1.api import api_router
+from app.api.response_cache import cache_responses
 from app.core.config import settings
+from app.db.replica import read_your_writes
 from backend_pre_start import main
 
 app = FastAPI(
@@ -20,6 +22,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# reads of a client that just wrote go to the primary, see app/db/replica.py
+if settings.USE_READ_REPLICAS:
+    app.middleware("http")(read_your_writes(settings.READ_YOUR_WRITES_SECONDS))
+
+# GET responses are served from app.core.cache.response_cache until a table they read is written
+if settings.USE_RESPONSE_CACHE:
+    app.middleware("http")(cache_responses([settings.API_V1_STR]))
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
@@ -22,6 +22,10 @@ python /app/backend_pre_start.py
 echo "📜 Running migrations..."
 alembic upgrade head
 
+# Index the rows of the searchable columns that have no trigrams yet
+echo "🔎 Indexing missing trigrams..."
+python /app/rebuild_trigrams.py --missing
+
 # Load initial data
 echo "🌱 Loading initial data..."
 python /app/initial_data.py
@@ -0,0 +1,43 @@
+"""
+Rebuild the trigrams of the `ratio` operator (app/db/trigram.py) for the
+rows written outside `CRUDBase`, e.g. raw SQL or rows existing before a
+column was made searchable.
+
+    python rebuild_trigrams.py [table ...]   # rebuild every table, or the given ones
+    python rebuild_trigrams.py --missing     # only tables with rows but no trigrams (prestart.sh)
+"""
+import logging
+import sys
+
+from app import crud
+from app.crud.base import CRUDBase
+from app.db.session import SessionLocal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main(args) -> None:
+    missing_only = "--missing" in args
+    tables = [arg for arg in args if not arg.startswith("--")]
+    crud_objects = {
+        obj.model.__tablename__: obj
+        for obj in vars(crud).values()
+        if isinstance(obj, CRUDBase) and obj.get_trigram_columns()
+    }
+    db = SessionLocal()
+    try:
+        for table_name, crud_object in crud_objects.items():
+            if tables and table_name not in tables:
+                continue
+            if missing_only and not crud_object.has_missing_trigrams(db):
+                continue
+            logger.info("Rebuilding the trigrams of %s", table_name)
+            indexed = crud_object.rebuild_trigrams(db)
+            logger.info("%s rows of %s indexed", indexed, table_name)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -15,6 +15,7 @@ from app.db.session import SessionLocal
 from app.db import session as db_session
 from app.db import base
 from app.api import deps
+from app.core.config import settings
 
 # Create an in-memory SQLite database for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -28,6 +29,15 @@ db_session.SessionLocal = TestingSessionLocal
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+if settings.USE_ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+    from app.db import async_session as db_async_session
+
+    # same database file as the sync engine, no pooling across event loops
+    async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+    TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db() -> Generator:
     try:
@@ -55,6 +65,13 @@ def client(db):
         finally:
             db.close()
     app.dependency_overrides[deps.get_db] = override_get_db
+    app.dependency_overrides[deps.get_read_db] = override_get_db
+    if settings.USE_ASYNC_DB:
+        async def override_get_async_db():
+            async with TestingAsyncSessionLocal() as async_db:
+                yield async_db
+        app.dependency_overrides[db_async_session.get_async_db] = override_get_async_db
+        app.dependency_overrides[db_async_session.get_async_read_db] = override_get_async_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides = {}
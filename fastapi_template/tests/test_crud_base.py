@@ -0,0 +1,468 @@
+from datetime import date, datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, and_, create_engine, event, extract, func, or_
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+
+from app.core import cache
+from app.crud.base import ORDER_BY_METHODS, CRUDBase
+from app.db.trigram import Trigram
+
+SampleBase = declarative_base()
+
+
+class SampleCategory(SampleBase):
+    __tablename__ = "sample_category"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(50))
+    updated_at = Column(DateTime, nullable=True)
+    deleted_at = Column(DateTime, nullable=True)
+
+    products = relationship("SampleProduct", back_populates="category")
+
+
+class SampleProduct(SampleBase):
+    __tablename__ = "sample_product"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(50))
+    price = Column(Integer)
+    category_id = Column(Integer, ForeignKey("sample_category.id"))
+    created_at = Column(DateTime, nullable=True)
+    deleted_at = Column(DateTime, nullable=True)
+
+    category = relationship("SampleCategory", foreign_keys=[category_id], back_populates="products")
+
+
+class SampleCustomer(SampleBase):
+    __tablename__ = "sample_customer"
+    __trigram_columns__ = ("name",)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(50))
+    deleted_at = Column(DateTime, nullable=True)
+
+
+@pytest.fixture
+def sample_db():
+    engine = create_engine("sqlite://")
+    SampleBase.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    food = SampleCategory(name="food")
+    tools = SampleCategory(name="tools")
+    session.add_all([food, tools])
+    session.flush()
+    session.add_all([
+        SampleProduct(name="apple", price=2, category_id=food.id),
+        SampleProduct(name="bread", price=5, category_id=food.id),
+        SampleProduct(name="hammer", price=20, category_id=tools.id),
+    ])
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_filter_plan_is_reused_across_values(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+
+    cheap = crud_product.get_multi_where_array(
+        db=sample_db, where=[{"key": "price", "operator": "<", "value": 10}]
+    )
+    expensive = crud_product.get_multi_where_array(
+        db=sample_db, where=[{"key": "price", "operator": ">", "value": 10}]
+    )
+    cheaper = crud_product.get_multi_where_array(
+        db=sample_db, where=[{"key": "price", "operator": "<", "value": 3}]
+    )
+
+    assert sorted(p.name for p in cheap) == ["apple", "bread"]
+    assert [p.name for p in expensive] == ["hammer"]
+    assert [p.name for p in cheaper] == ["apple"]
+    assert crud_product.get_filter_plan.cache_info().hits > 0
+
+
+def test_filter_plan_on_relation_path(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+    where = [{"key": "category.name", "operator": "==", "value": "tools"}]
+
+    products = crud_product.get_multi_where_array(db=sample_db, where=where)
+
+    assert [p.name for p in products] == ["hammer"]
+
+
+def test_order_by_many_to_one_path_is_joined(sample_db, monkeypatch):
+    crud_product = CRUDBase(SampleProduct)
+    monkeypatch.setitem(ORDER_BY_METHODS, "upper", lambda model, name: func.upper(getattr(model, name)))
+
+    query = crud_product.get_page_query(db=sample_db, order_by="category.name", order="ASC")
+    by_method = crud_product.get_multi_where_array(db=sample_db, order_by="category.@upper('name')", order="DESC")
+
+    assert "LEFT OUTER JOIN" in str(query) and "(SELECT" not in str(query)
+    assert [p.name for p in query.all()] == ["bread", "apple", "hammer"]
+    assert [p.name for p in by_method] == ["hammer", "bread", "apple"]
+    with pytest.raises(HTTPException):
+        crud_product.get_multi_where_array(db=sample_db, order_by="category.@eval('1')")
+
+
+def test_order_by_to_many_path_uses_subquery(sample_db):
+    crud_category = CRUDBase(SampleCategory)
+
+    categories = crud_category.get_multi_where_array(db=sample_db, order_by="products.price", order="DESC")
+
+    assert [c.name for c in categories] == ["tools", "food"]
+
+
+def count_statements(session, run):
+    statements = []
+    engine = session.get_bind()
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = run()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return result, len(statements)
+
+
+def test_relation_loading_strategy(sample_db):
+    crud_category = CRUDBase(SampleCategory)
+    crud_product = CRUDBase(SampleProduct)
+
+    categories, selectin_count = count_statements(sample_db, lambda: crud_category.get_multi_where_array(
+        db=sample_db, relations=["products{id,name}"], order="ASC"
+    ))
+    sample_db.expunge_all()
+    _, joined_count = count_statements(sample_db, lambda: crud_category.get_multi_where_array(
+        db=sample_db, relations=["products:joined"]
+    ))
+    sample_db.expunge_all()
+    products, many_to_one_count = count_statements(sample_db, lambda: crud_product.get_multi_where_array(
+        db=sample_db, relations=["category.products"]
+    ))
+
+    assert [[p.name for p in c.products] for c in categories] == [["apple", "bread"], ["hammer"]]
+    assert (selectin_count, joined_count, many_to_one_count) == (2, 1, 2)
+    assert all(p.category.products for p in products)
+    with pytest.raises(HTTPException):
+        crud_category.get_joined_load(["products:lazy"])
+
+
+def test_relation_strategy_with_columns(sample_db):
+    crud_category = CRUDBase(SampleCategory)
+
+    for relation in ("products:select{id,name}", "products{id,name}:select"):
+        sample_db.expunge_all()
+        categories, count = count_statements(sample_db, lambda: crud_category.get_multi_where_array(
+            db=sample_db, relations=[relation], order="ASC"
+        ))
+
+        assert [[p.name for p in c.products] for c in categories] == [["apple", "bread"], ["hammer"]]
+        assert count == 2
+
+
+def test_get_page_with_count(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+    where = [{"key": "category.name", "operator": "==", "value": "food"}]
+
+    data, count = crud_product.get_page_with_count(db=sample_db, where=where, limit=1)
+    empty, empty_count = crud_product.get_page_with_count(db=sample_db, where=where, skip=5)
+
+    assert len(data) == 1
+    assert count == 2
+    assert empty == []
+    assert empty_count == 2
+
+
+def test_get_page_by_cursor_walks_all_rows(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+
+    first, cursor = crud_product.get_page_by_cursor(db=sample_db, limit=2, order_by="price")
+    second, last_cursor = crud_product.get_page_by_cursor(
+        db=sample_db, limit=2, order_by="price", cursor=cursor
+    )
+
+    assert [p.name for p in first] == ["hammer", "bread"]
+    assert [p.name for p in second] == ["apple"]
+    assert last_cursor is None
+
+
+def test_cached_count_mode(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+    where = [{"key": "price", "operator": ">", "value": 1}]
+
+    first = crud_product.get_count_where_array(db=sample_db, where=where, count_mode="cached")
+    sample_db.add(SampleProduct(name="saw", price=15))
+    sample_db.commit()
+    cached = crud_product.get_count_where_array(db=sample_db, where=where, count_mode="cached")
+    exact = crud_product.get_count_where_array(db=sample_db, where=where)
+
+    assert first == cached == 3
+    assert exact == 4
+
+
+def test_estimated_count_mode_skips_soft_deleted_models(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+    apple = sample_db.query(SampleProduct).filter(SampleProduct.name == "apple").one()
+    crud_product.soft_delete(db=sample_db, id=apple.id)
+
+    assert crud_product.get_estimated_count(sample_db) is None
+    assert crud_product.get_count_where_array(db=sample_db, count_mode="estimated") == 2
+
+
+def test_bulk_create_in_batches(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+    rows = [{"name": f"nail {i}", "price": i} for i in range(5)]
+
+    count, ids = crud_product.bulk_create(db=sample_db, objs_in=rows, batch_size=2, return_ids=True)
+    no_ids_count, no_ids = crud_product.bulk_create(db=sample_db, objs_in=rows[:2])
+
+    assert count == 5
+    assert len(ids) == 5
+    assert [p.name for p in sample_db.query(SampleProduct).filter(SampleProduct.id.in_(ids))] == [
+        row["name"] for row in rows
+    ]
+    assert (no_ids_count, no_ids) == (2, [])
+
+
+def test_update_by_id_without_loading_the_row(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+    hammer = sample_db.query(SampleProduct).filter(SampleProduct.name == "hammer").one()
+
+    updated = crud_product.update_by_id(db=sample_db, id=hammer.id, obj_in={"price": 25, "unknown": 1})
+    missing = crud_product.update_by_id(db=sample_db, id=0, obj_in={"price": 25})
+
+    assert updated.id == hammer.id
+    assert updated.price == 25
+    assert updated.name == "hammer"
+    assert sample_db.get(SampleProduct, hammer.id).price == 25
+    assert missing is None
+
+
+def test_soft_delete_and_restore(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+    apple = sample_db.query(SampleProduct).filter(SampleProduct.name == "apple").one()
+
+    deleted = crud_product.soft_delete(db=sample_db, id=apple.id)
+    deleted_at = deleted.deleted_at
+    visible = crud_product.get_count_where_array(db=sample_db)
+    restored = crud_product.restore_deleted(db=sample_db, id=apple.id)
+
+    assert deleted is restored is apple
+    assert deleted_at is not None
+    assert deleted.deleted_at is None
+    assert visible == 2
+    assert crud_product.get_count_where_array(db=sample_db) == 3
+    assert crud_product.soft_delete(db=sample_db, id=0) is None
+
+
+def test_soft_delete_where_in_chunks(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+    sample_db.add_all([SampleProduct(name=f"screw {i}", price=1) for i in range(5)])
+    sample_db.commit()
+    progress = []
+
+    deleted = crud_product.soft_delete_where(
+        db=sample_db,
+        where=[{"key": "price", "operator": "<", "value": 3}],
+        chunk_size=2,
+        progress=progress.append,
+    )
+
+    assert deleted == 6
+    assert progress == [2, 4, 6]
+    assert [p.name for p in crud_product.get_multi_where_array(db=sample_db, order="ASC")] == [
+        "bread", "hammer"
+    ]
+
+
+def test_bulk_remove_in_chunks(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+    ids = [p.id for p in sample_db.query(SampleProduct).order_by(SampleProduct.id)]
+    progress = []
+
+    chunks = crud_product.bulk_remove(
+        db=sample_db,
+        ids_to_delete="\n".join(str(i) for i in [ids[0], 0, ids[1]]) + "\n",
+        chunk_size=2,
+        progress=progress.append,
+    )
+    json_chunks = crud_product.bulk_remove(db=sample_db, ids_to_delete=f"[{ids[2]}, 0]")
+
+    assert chunks == [1, 1]
+    assert progress == [1, 2]
+    assert json_chunks == [1]
+    assert sample_db.query(SampleProduct).count() == 0
+
+
+def test_export_streams_selected_columns(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+
+    result = crud_product.export(
+        sample_db, where=[{"key": "price", "operator": "<", "value": 10}], columns=("id", "name"), chunk_size=1
+    )
+
+    assert list(result.keys()) == ["id", "name"]
+    assert [row.name for row in result] == ["apple", "bread"]
+
+
+def test_aggregate_by_relation_path(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+
+    groups = crud_product.aggregate(
+        db=sample_db,
+        group_by=["category.name"],
+        metrics=["count", "sum:price", "max:price"],
+        where=[{"key": "price", "operator": ">", "value": 1}],
+    )
+    total = crud_product.aggregate(db=sample_db)
+
+    assert groups == [
+        {"category.name": "food", "count": 2, "sum_price": 7, "max_price": 5},
+        {"category.name": "tools", "count": 1, "sum_price": 20, "max_price": 20},
+    ]
+    assert total == [{"count": 3}]
+    with pytest.raises(HTTPException):
+        crud_product.aggregate(db=sample_db, metrics=["median:price"])
+    with pytest.raises(HTTPException):
+        crud_product.aggregate(db=sample_db, group_by=["category.unknown"])
+
+
+DATE_BOUNDARIES = [
+    datetime(2023, 12, 31, 23, 59, 59, 999999),
+    datetime(2024, 1, 1),
+    datetime(2024, 1, 1, 0, 0, 1),
+    datetime(2024, 2, 29, 12),
+    datetime(2024, 3, 1),
+    datetime(2024, 12, 31, 23, 59, 59),
+    datetime(2025, 1, 1),
+]
+
+
+def year_of(column):
+    return extract("year", column)
+
+
+@pytest.mark.parametrize("operator, value, reference", [
+    ("year", 2024, lambda c: year_of(c) == 2024),
+    ("year", "2023", lambda c: year_of(c) == 2023),
+    ("lower_or_equal_year", 2023, lambda c: year_of(c) <= 2023),
+    ("greater_or_equal_year", 2024, lambda c: year_of(c) >= 2024),
+    ("date", "2024-01-01", lambda c: func.date(c) == date(2024, 1, 1)),
+    ("date", "2024-02-29", lambda c: func.date(c) == date(2024, 2, 29)),
+    ("in_date_range", ["2024-02", "2023"], lambda c: or_(
+        and_(year_of(c) == 2024, extract("month", c) == 2), year_of(c) == 2023
+    )),
+    ("in_date_range", ["2024-12"], lambda c: and_(year_of(c) == 2024, extract("month", c) == 12)),
+])
+def test_date_operators_match_their_function_based_version(sample_db, operator, value, reference):
+    crud_product = CRUDBase(SampleProduct)
+    sample_db.add_all([SampleProduct(name=str(moment), created_at=moment) for moment in DATE_BOUNDARIES])
+    sample_db.commit()
+
+    ids = [p.id for p in crud_product.get_multi_where_array(
+        db=sample_db, where=[{"key": "created_at", "operator": operator, "value": value}], order="ASC"
+    )]
+    expected = [row.id for row in sample_db.query(SampleProduct.id).filter(
+        reference(SampleProduct.created_at)
+    ).order_by(SampleProduct.id)]
+
+    assert expected
+    assert ids == expected
+
+
+def test_search_operator(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+    where = [{"key": "name", "operator": "search", "value": "amm"}]
+
+    products = crud_product.get_multi_where_array(db=sample_db, where=where)
+    condition = crud_product.get_full_condition(where=where, include_deleted=True)
+
+    assert [p.name for p in products] == ["hammer"]
+    assert "MATCH (sample_product.name) AGAINST" in str(condition.compile(dialect=mysql.dialect()))
+
+
+def levenshtein_ratio(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return 1 - previous[-1] / max(len(a), len(b), 1)
+
+
+def test_ratio_prefilters_on_trigrams(sample_db):
+    Trigram.__table__.create(bind=sample_db.get_bind())
+    sample_db.connection().connection.driver_connection.create_function("levenshtein_ratio", 2, levenshtein_ratio)
+    crud_customer = CRUDBase(SampleCustomer)
+
+    _, ids = crud_customer.bulk_create(
+        db=sample_db, objs_in=[{"name": "Jonathan"}, {"name": "Jonatan"}, {"name": "Maria"}], return_ids=True
+    )
+    crud_customer.update_by_id(db=sample_db, id=ids[2], obj_in={"name": "Johnathan"})
+    crud_customer.remove(db=sample_db, id=ids[1])
+    where = [{"key": "name", "operator": "ratio", "value": ["jonathan", 80]}]
+    condition = crud_customer.get_full_condition(where=where, include_deleted=True)
+
+    customers = crud_customer.get_multi_where_array(db=sample_db, where=where, order="ASC")
+
+    assert [c.name for c in customers] == ["Jonathan", "Johnathan"]
+    assert {row.row_id for row in sample_db.query(Trigram)} == {ids[0], ids[2]}
+    assert "trigram" in str(condition)
+
+
+def test_get_version(sample_db):
+    crud_category = CRUDBase(SampleCategory)
+    crud_product = CRUDBase(SampleProduct)
+
+    before = crud_category.get_version()
+    product_before = crud_product.get_version()
+    crud_category.update_by_id(db=sample_db, id=1, obj_in={"name": "fruit"})
+    first = crud_category.get_version()
+    # a second write within the same second still changes the version
+    crud_category.update_by_id(db=sample_db, id=1, obj_in={"name": "fruits"})
+    second = crud_category.get_version()
+
+    assert len({before, first, second}) == 3
+    assert before[0] == second[0] == cache.table_versions.epoch
+    assert crud_product.get_version() == product_before
+
+
+def test_rebuild_trigrams_and_delete_by_condition(sample_db):
+    Trigram.__table__.create(bind=sample_db.get_bind())
+    sample_db.connection().connection.driver_connection.create_function("levenshtein_ratio", 2, levenshtein_ratio)
+    crud_customer = CRUDBase(SampleCustomer)
+    sample_db.execute(SampleCustomer.__table__.insert(), [{"name": "Jonathan"}, {"name": "Maria"}])
+    sample_db.commit()
+    where = [{"key": "name", "operator": "ratio", "value": ["jonathan", 80]}]
+
+    missing = crud_customer.has_missing_trigrams(sample_db)
+    before = crud_customer.get_multi_where_array(db=sample_db, where=where)
+    indexed = crud_customer.rebuild_trigrams(sample_db, chunk_size=1)
+    after = crud_customer.get_multi_where_array(db=sample_db, where=where)
+    removed = crud_customer.remove_where_array(
+        sample_db, where=[{"key": "name", "operator": "==", "value": "Maria"}]
+    )
+
+    assert missing and not crud_customer.has_missing_trigrams(sample_db)
+    assert before == []
+    assert indexed == 2
+    assert removed == 1
+    assert [c.name for c in after] == ["Jonathan"]
+    assert {row.row_id for row in sample_db.query(Trigram)} == {after[0].id}
+
+
+def test_filter_plan_cache_is_per_crud_object(sample_db):
+    crud_product = CRUDBase(SampleProduct)
+    crud_category = CRUDBase(SampleCategory)
+
+    crud_product.get_multi_where_array(db=sample_db, where=[{"key": "name", "operator": "==", "value": "apple"}])
+
+    assert crud_product.get_filter_plan is not crud_category.get_filter_plan
+    assert crud_product.get_filter_plan.cache_info().currsize > 0
+    assert crud_category.get_filter_plan.cache_info().currsize == 0
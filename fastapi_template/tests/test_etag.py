@@ -0,0 +1,28 @@
+from starlette.requests import Request
+
+from app.api.etag import etag_matches, make_etag
+
+
+def make_request(query_string=b"", if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/items/", "query_string": query_string, "headers": headers})
+
+
+def test_make_etag_depends_on_version_and_query():
+    etag = make_etag(make_request(b"limit=20&offset=0"), ("2024-01-01 10:00:00", 3))
+
+    assert etag.startswith('W/"')
+    assert etag == make_etag(make_request(b"offset=0&limit=20"), ("2024-01-01 10:00:00", 3))
+    assert etag != make_etag(make_request(b"offset=20&limit=20"), ("2024-01-01 10:00:00", 3))
+    assert etag != make_etag(make_request(b"limit=20&offset=0"), ("2024-01-01 10:00:00", 2))
+    assert make_etag(make_request(), None) is None
+
+
+def test_etag_matches_if_none_match():
+    etag = make_etag(make_request(), (None, 0))
+
+    assert etag_matches(make_request(if_none_match=f'"other", {etag}'), etag)
+    assert etag_matches(make_request(if_none_match=etag.removeprefix("W/")), etag)
+    assert etag_matches(make_request(if_none_match="*"), etag)
+    assert not etag_matches(make_request(if_none_match='"other"'), etag)
+    assert not etag_matches(make_request(), etag)
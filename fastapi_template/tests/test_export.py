@@ -0,0 +1,36 @@
+import json
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.export import iter_export
+
+
+def make_result():
+    engine = create_engine("sqlite://")
+    db = sessionmaker(bind=engine)()
+    result = db.execute(text(
+        "SELECT 1 AS id, 'apple' AS name UNION ALL SELECT 2, 'bread' UNION ALL SELECT 3, 'saw, big'"
+    ))
+    return db, result
+
+
+def test_iter_export_ndjson_in_chunks():
+    db, result = make_result()
+
+    chunks = list(iter_export(db, result, format="ndjson", chunk_size=2))
+
+    assert len(chunks) == 2
+    assert [json.loads(line) for line in b"".join(chunks).splitlines()] == [
+        {"id": 1, "name": "apple"},
+        {"id": 2, "name": "bread"},
+        {"id": 3, "name": "saw, big"},
+    ]
+
+
+def test_iter_export_csv():
+    db, result = make_result()
+
+    body = b"".join(iter_export(db, result, format="csv")).decode()
+
+    assert body.splitlines() == ["id,name", "1,apple", "2,bread", '3,"saw, big"']
@@ -0,0 +1,59 @@
+import json
+from typing import List, Optional
+
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel, ConfigDict
+
+from app.api.fields import fields_response, parse_fields
+
+COLUMN_KEYS = ("id", "name", "price", "category_id")
+
+
+class Category(BaseModel):
+    id: Optional[int]
+    name: Optional[str] = None
+
+
+class Product(BaseModel):
+    id: Optional[int]
+    name: Optional[str] = None
+    price: Optional[int] = None
+    category_id: Optional[int] = None
+    category: Optional[Category] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ResponseProduct(BaseModel):
+    count: int
+    data: Optional[List[Product]]
+    next_cursor: Optional[str] = None
+
+
+def test_parse_fields_always_includes_id():
+    assert parse_fields("name, price,name", COLUMN_KEYS) == ("id", "name", "price")
+    assert parse_fields(None, COLUMN_KEYS) is None
+    assert parse_fields(" ", COLUMN_KEYS) is None
+
+
+def test_parse_fields_rejects_unknown_columns():
+    with pytest.raises(HTTPException) as exc:
+        parse_fields("name,category", COLUMN_KEYS)
+    assert exc.value.status_code == 400
+
+
+def test_fields_response_narrows_the_data_items():
+    content = {
+        "count": 1,
+        "data": [{"id": 1, "name": "apple", "price": 2, "category": {"id": 3, "name": "food"}}],
+        "next_cursor": None,
+    }
+
+    response = fields_response(ResponseProduct, content, fields=("id", "name"), column_keys=COLUMN_KEYS)
+
+    assert json.loads(response.body) == {
+        "count": 1,
+        "data": [{"id": 1, "name": "apple", "category": {"id": 3, "name": "food"}}],
+        "next_cursor": None,
+    }
@@ -0,0 +1,39 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.query_parser import MAX_QUERY_DEPTH, parse_relation, parse_where
+
+
+def test_parse_where_accepts_json_and_python_literals():
+    as_json = parse_where('[{"key":"name","operator":"like","value":"a"}]')
+    as_literal = parse_where("[{'key': 'name', 'operator': 'like', 'value': 'a'}]")
+
+    assert as_json == as_literal == [{"key": "name", "operator": "like", "value": "a"}]
+    assert parse_where("[]") == []
+    assert parse_where(None) == []
+
+
+def test_parse_where_returns_a_copy():
+    first = parse_where('[{"key":"id","operator":"==","value":1}]')
+    first.append({"key": "deleted_at", "operator": "isNull"})
+
+    assert len(parse_where('[{"key":"id","operator":"==","value":1}]')) == 1
+
+
+def test_parse_relation():
+    assert parse_relation('["category", "category.owner{id,name}"]') == [
+        "category", "category.owner{id,name}"
+    ]
+
+
+@pytest.mark.parametrize("raw", [
+    "[" * (MAX_QUERY_DEPTH + 1) + "]" * (MAX_QUERY_DEPTH + 1),
+    "[{'key': 'id'}]",
+    "{'key': 'id', 'operator': '=='}",
+    "__import__('os')",
+    "[" + ",".join(["{'key': 'id', 'operator': 'isNull'}"] * 101) + "]",
+])
+def test_parse_where_rejects_invalid_payloads(raw):
+    with pytest.raises(HTTPException) as exc:
+        parse_where(raw)
+    assert exc.value.status_code == 400
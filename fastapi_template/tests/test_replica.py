@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.db.replica import ReplicaRouter, parse_replica_uris, read_your_writes, reads_primary
+
+
+def make_engine(name, checked_out=0):
+    return SimpleNamespace(name=name, pool=SimpleNamespace(checkedout=lambda: checked_out))
+
+
+def test_parse_replica_uris():
+    assert parse_replica_uris(" mysql://a/db, ,mysql://b/db") == ["mysql://a/db", "mysql://b/db"]
+    assert parse_replica_uris("") == []
+
+
+def test_replica_router_strategies():
+    engines = [make_engine("a", 3), make_engine("b", 1), make_engine("c", 2)]
+
+    round_robin = ReplicaRouter(engines)
+    least_connections = ReplicaRouter(engines, "least_connections")
+
+    assert [round_robin.pick().name for _ in range(4)] == ["a", "b", "c", "a"]
+    assert least_connections.pick().name == "b"
+    assert ReplicaRouter([]).pick() is None
+    with pytest.raises(ValueError):
+        ReplicaRouter(engines, "random")
+
+
+def test_reads_go_to_the_primary_after_a_write():
+    app = FastAPI()
+    app.middleware("http")(read_your_writes(60))
+
+    @app.get("/items")
+    def read_items(request: Request):
+        return {"primary": reads_primary(request)}
+
+    @app.post("/items")
+    def create_item():
+        return {}
+
+    client = TestClient(app)
+
+    assert client.get("/items").json() == {"primary": False}
+    client.post("/items")
+    assert client.get("/items").json() == {"primary": True}
+
+
+def test_bearer_clients_read_their_writes_without_the_cookie():
+    app = FastAPI()
+    app.middleware("http")(read_your_writes(60))
+
+    @app.get("/items")
+    def read_items(request: Request):
+        return {"primary": reads_primary(request)}
+
+    @app.post("/items")
+    def create_item():
+        return {}
+
+    # a client that never sends the cookie back
+    writer = {"Authorization": "Bearer writer"}
+    TestClient(app).post("/items", headers=writer)
+
+    assert TestClient(app).get("/items", headers=writer).json() == {"primary": True}
+    assert TestClient(app).get("/items", headers={"Authorization": "Bearer other"}).json() == {
+        "primary": False
+    }
@@ -0,0 +1,112 @@
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.response_cache import RESPONSE_CACHE_HEADER, cache_responses
+from app.core import cache
+from app.crud.base import CRUDBase
+
+CachedBase = declarative_base()
+
+
+class CachedShelf(CachedBase):
+    __tablename__ = "cached_shelf"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+
+
+class CachedBook(CachedBase):
+    __tablename__ = "cached_book"
+    id = Column(Integer, primary_key=True)
+    title = Column(String(50))
+    shelf_id = Column(Integer, ForeignKey("cached_shelf.id"))
+    shelf = relationship("CachedShelf")
+
+
+class SharedBackend:
+    """Stand-in for a shared cache backend."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value, ttl=None):
+        self.data[key] = value
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(cache, "response_cache", SharedBackend())
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    CachedBase.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    crud_shelf = CRUDBase(CachedShelf)
+    crud_book = CRUDBase(CachedBook)
+    crud_shelf.bulk_create(db=db, objs_in=[{"id": 1, "name": "novels"}])
+    crud_book.bulk_create(db=db, objs_in=[{"title": "Dune", "shelf_id": 1}])
+
+    app = FastAPI()
+    app.middleware("http")(cache_responses())
+
+    @app.get("/books")
+    def read_books(response: Response, relation: bool = False):
+        response.headers["ETag"] = 'W/"books"'
+        books = crud_book.get_multi_where_array(
+            db=db, relations=["shelf{id,name}"] if relation else None, include_deleted=True
+        )
+        return [{"title": b.title, "shelf": b.shelf.name if relation else None} for b in books]
+
+    @app.post("/books")
+    def create_book():
+        crud_book.bulk_create(db=db, objs_in=[{"title": "Emma", "shelf_id": 1}])
+
+    @app.post("/shelves")
+    def rename_shelf():
+        crud_shelf.update_by_id(db=db, id=1, obj_in={"name": "classics"})
+
+    yield TestClient(app)
+    db.close()
+
+
+def test_response_is_cached_until_the_table_is_written(client):
+    first = client.get("/books")
+    second = client.get("/books")
+    client.post("/books")
+    third = client.get("/books")
+
+    assert first.headers[RESPONSE_CACHE_HEADER] == "MISS"
+    assert second.headers[RESPONSE_CACHE_HEADER] == "HIT"
+    assert second.json() == first.json()
+    assert third.headers[RESPONSE_CACHE_HEADER] == "MISS"
+    assert [book["title"] for book in third.json()] == ["Emma", "Dune"]
+
+
+def test_write_to_an_included_relation_invalidates(client):
+    client.get("/books?relation=true")
+    client.get("/books")
+    client.post("/shelves")
+
+    included = client.get("/books?relation=true")
+    not_included = client.get("/books")
+
+    assert included.headers[RESPONSE_CACHE_HEADER] == "MISS"
+    assert included.json() == [{"title": "Dune", "shelf": "classics"}]
+    assert not_included.headers[RESPONSE_CACHE_HEADER] == "HIT"
+
+
+def test_hit_replays_the_etag_and_answers_if_none_match(client):
+    client.get("/books")
+
+    hit = client.get("/books")
+    not_modified = client.get("/books", headers={"If-None-Match": hit.headers["etag"]})
+
+    assert hit.headers[RESPONSE_CACHE_HEADER] == "HIT"
+    assert hit.headers["etag"] == 'W/"books"'
+    assert hit.headers["content-type"] == "application/json"
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == 'W/"books"'
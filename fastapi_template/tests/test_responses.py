@@ -0,0 +1,64 @@
+import json
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, load_only, relationship, sessionmaker
+
+from app.api.responses import json_response
+
+ResponseBase = declarative_base()
+
+
+class Owner(ResponseBase):
+    __tablename__ = "response_owner"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+
+
+class Pet(ResponseBase):
+    __tablename__ = "response_pet"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+    owner_id = Column(Integer, ForeignKey("response_owner.id"))
+    owner = relationship("Owner")
+
+
+class OwnerSchema(BaseModel):
+    id: Optional[int]
+    name: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PetSchema(BaseModel):
+    id: Optional[int]
+    name: Optional[str] = None
+    owner: Optional[OwnerSchema] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ResponsePet(BaseModel):
+    count: int
+    data: Optional[List[PetSchema]]
+
+
+ResponsePetAdapter = TypeAdapter(ResponsePet)
+
+
+def test_json_response_only_reads_loaded_attributes():
+    engine = create_engine("sqlite://")
+    ResponseBase.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Pet(name="rex", owner=Owner(name="ann")))
+    session.commit()
+    pets = session.query(Pet).options(load_only(Pet.id)).all()
+    session.close()
+
+    response = json_response(ResponsePetAdapter, {"count": 1, "data": pets})
+
+    assert json.loads(response.body) == {
+        "count": 1,
+        "data": [{"id": pets[0].id, "name": None, "owner": None}],
+    }
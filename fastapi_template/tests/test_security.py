@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+
+
+def test_password_hash_in_pool():
+    hashed = security.run_in_password_pool(security.get_password_hash, "secret")
+
+    assert security.verify_password("secret", hashed)
+    assert asyncio.run(security.verify_password_async("secret", hashed))
+    assert not asyncio.run(security.verify_password_async("wrong", hashed))
+
+
+def test_get_password_hash_async():
+    hashed = asyncio.run(security.get_password_hash_async("secret"))
+
+    assert security.verify_password("secret", hashed)
+
+
+def test_password_pool_stats():
+    before = security.password_pool_stats()["completed"]
+
+    security.run_in_password_pool(security.get_password_hash, "secret")
+    stats = security.password_pool_stats()
+
+    assert stats["completed"] == before + 1
+    assert stats["pending"] == stats["running"] == 0
+
+
+def test_password_pool_rejects_when_queue_is_full(monkeypatch):
+    monkeypatch.setattr(security, "PASSWORD_HASH_QUEUE_SIZE", 0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        security.run_in_password_pool(security.get_password_hash, "secret")
+
+    assert exc_info.value.status_code == 503
+    assert security.password_pool_stats()["rejected"] >= 1
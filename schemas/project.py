@@ -10,6 +10,7 @@ class AttributesModel(BaseModel):
     length: Optional[int] = None
     is_primary: bool = False
     is_indexed: bool = False
+    is_searchable: bool = False
     is_auto_increment: bool = False
     is_required: bool = True
     is_unique: bool = False
@@ -65,6 +66,9 @@ class OtherConfigSchema(BaseModel):
     use_docker: bool = True
     use_authentication: bool = True
     use_socket: bool = False
+    use_async_db: bool = False
+    use_read_replicas: bool = False
+    use_response_cache: bool = False
 
 
 class ConfigSchema(BaseModel):